@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from data.loader import STM32CubeMX_Loader, STM32CubeMX_CSV_Loader, AutodeskEagle_SCH_Loader
+from data.dataModel import TargetNetContainer
+from data.partIndex import PartIndex
+from .generator import SyntheticProject
+
+class BenchmarkCase:
+    def __init__(self, name, function, args, size, unit):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.size = size
+        self.unit = unit
+
+    def measure(self, repeat):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.function(*self.args)
+            times.append(time.perf_counter() - start)
+
+        # a separate run, tracemalloc slows down the timed ones
+        tracemalloc.start()
+        self.function(*self.args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        best = min(times)
+        return {
+            "best": best,
+            "mean": sum(times) / len(times),
+            "throughput": self.size / best if best > 0 else None,
+            "unit": self.unit,
+            "peak_memory": peak
+        }
+
+def typeQuery(index, query):
+    # one search per key stroke, like the filter of the IC picker
+    for idx in range(len(query) + 1):
+        index.search(query[:idx])
+
+def createCases(project):
+    ioc = project.ioc()
+    csv = project.csv()
+    sch = project.sch()
+    brd = project.brd()
+
+    ioc_model = STM32CubeMX_Loader.getModel(ioc)
+    csv_model = STM32CubeMX_CSV_Loader.getModel(csv)
+    sch_model = AutodeskEagle_SCH_Loader.getModel(sch, "U1")
+
+    stm_to_eagle = TargetNetContainer.fromNNC(sch_model, ioc_model)
+    eagle_to_ioc = TargetNetContainer.fromNNC(ioc_model, sch_model)
+    eagle_to_csv = TargetNetContainer.fromNNC(csv_model, sch_model)
+
+    parts = AutodeskEagle_SCH_Loader.getPartList(sch)
+
+    MB = 1024 * 1024
+    return [
+        BenchmarkCase("STM32CubeMX_Loader.getModel", STM32CubeMX_Loader.getModel, (ioc,), len(ioc) / MB, "MB/s"),
+        BenchmarkCase("STM32CubeMX_CSV_Loader.getModel", STM32CubeMX_CSV_Loader.getModel, (csv,), len(csv) / MB, "MB/s"),
+        BenchmarkCase("AutodeskEagle_SCH_Loader.getICList", AutodeskEagle_SCH_Loader.getICList, (sch,), len(sch) / MB, "MB/s"),
+        BenchmarkCase("PartIndex", PartIndex, (parts, True), len(parts), "parts/s"),
+        BenchmarkCase("PartIndex.search", lambda: typeQuery(PartIndex(parts, True), "r12"), (), len(parts), "parts/s"),
+        BenchmarkCase("AutodeskEagle_SCH_Loader.getModel", AutodeskEagle_SCH_Loader.getModel, (sch, "U1"), len(sch) / MB, "MB/s"),
+        BenchmarkCase("TargetNetContainer.fromNNC", TargetNetContainer.fromNNC, (sch_model, ioc_model), len(sch_model) + len(ioc_model), "entries/s"),
+        BenchmarkCase("STM32CubeMX_Loader.applyOperation", STM32CubeMX_Loader.applyOperation, (ioc, eagle_to_ioc), len(ioc) / MB, "MB/s"),
+        BenchmarkCase("STM32CubeMX_CSV_Loader.applyOperation", STM32CubeMX_CSV_Loader.applyOperation, (csv, eagle_to_csv), len(csv) / MB, "MB/s"),
+        BenchmarkCase("AutodeskEagle_SCH_Loader.applyOperation", AutodeskEagle_SCH_Loader.applyOperation, (sch, brd, "U1", stm_to_eagle), (len(sch) + len(brd)) / MB, "MB/s"),
+    ]
+
+def compare(results, baseline, tolerance, out):
+    regressions = 0
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = result["best"] / baseline["results"][name]["best"]
+        if ratio > 1 + tolerance:
+            regressions += 1
+            out.write("REGRESSION {}: {:.2f}x slower than the baseline\n".format(name, ratio))
+    if baseline.get("scale") != results["scale"]:
+        out.write("Warning: the baseline was recorded with a different scale {}\n".format(json.dumps(baseline.get("scale"))))
+    return regressions
+
+def printResults(results, out):
+    out.write("{:<42} {:>10} {:>10} {:>16} {:>12}\n".format("case", "best [ms]", "mean [ms]", "throughput", "peak [MB]"))
+    for name, result in results["results"].items():
+        out.write("{:<42} {:>10.2f} {:>10.2f} {:>16} {:>12.2f}\n".format(
+            name,
+            result["best"] * 1000,
+            result["mean"] * 1000,
+            "{:.1f} {}".format(result["throughput"], result["unit"]) if result["throughput"] is not None else "-",
+            result["peak_memory"] / (1024 * 1024)
+        ))
+
+def Run(argv):
+    parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]), description="Benchmark all loaders on a synthetic project.")
+    parser.add_argument("--pins", type=int, default=200, help="number of MCU pins")
+    parser.add_argument("--nets", type=int, default=2000, help="number of nets in schematic and board")
+    parser.add_argument("--parts", type=int, default=2000, help="number of parts besides the MCU")
+    parser.add_argument("--library-size", type=int, default=500, help="number of packages in the embedded libraries")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--save", metavar="FILE", help="store the results as JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline, 0.25 = 25%%")
+    args = parser.parse_args(argv[1:])
+
+    scale = {
+        "pins": args.pins,
+        "nets": args.nets,
+        "parts": args.parts,
+        "library_size": args.library_size
+    }
+    project = SyntheticProject(**scale)
+
+    results = {
+        "scale": scale,
+        "python": platform.python_version(),
+        "results": {}
+    }
+    for case in createCases(project):
+        results["results"][case.name] = case.measure(args.repeat)
+
+    printResults(results, sys.stdout)
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, sys.stdout) > 0:
+            return 1
+    return 0
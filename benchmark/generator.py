@@ -0,0 +1,110 @@
+# builds a consistent set of synthetic STM32CubeMX and Autodesk Eagle files:
+# one MCU "U1" whose pins are wired to passive parts, some of the nets are
+# labelled differently in STM32CubeMX so that every operation has work to do
+class SyntheticProject:
+    PORTS = "ABCDEFGHIJK"
+
+    def __init__(self, pins=200, nets=400, parts=600, library_size=200):
+        self.pins = pins
+        self.nets = max(nets, pins)
+        self.parts = max(parts, 1)
+        self.library_size = library_size
+
+        self.pin_names = self.generatePinNames(pins)
+        self.net_names = ["N${}".format(i) if i % 3 == 0 else "NET_{}".format(i) for i in range(self.nets)]
+        # every second pin gets a new label, every fifth keeps its net name
+        self.labels = {}
+        for idx, pin in enumerate(self.pin_names):
+            if idx % 2 == 0:
+                self.labels[pin] = "LABEL_{}".format(idx)
+            elif idx % 5 == 0:
+                self.labels[pin] = self.net_names[idx]
+
+    @staticmethod
+    def generatePinNames(count):
+        names = []
+        for port in SyntheticProject.PORTS:
+            for idx in range(16):
+                if len(names) == count:
+                    return names
+                names.append("P{}{}".format(port, idx))
+        idx = 0
+        while len(names) < count:
+            names.append("VDD_{}".format(idx))
+            idx += 1
+        return names
+
+    def getPartForNet(self, idx):
+        return "R{}".format(idx % self.parts)
+
+    def ioc(self):
+        lines = [
+            "#MicroXplorer Configuration settings - do not modify",
+            "File.Version=6",
+            "Mcu.Family=STM32F4",
+            "Mcu.Name=STM32F429ZITx"
+        ]
+        for idx, pin in enumerate(self.pin_names):
+            lines.append("Mcu.Pin{}={}".format(idx, pin))
+        for pin in self.pin_names:
+            lines.append("{}.GPIOParameters=GPIO_Label".format(pin))
+            if pin in self.labels:
+                lines.append("{}.GPIO_Label={}".format(pin, self.labels[pin]))
+            lines.append("{}.Locked=true".format(pin))
+            lines.append("{}.Signal=GPIO_Output".format(pin))
+        lines.append("VP_SYS_VS_Systick.Mode=SysTick")
+        return "\n".join(lines) + "\n"
+
+    def csv(self):
+        lines = ['"Position","Name","Type","Signal","Label"']
+        for idx, pin in enumerate(self.pin_names):
+            lines.append('"{}","{}","I/O","GPIO_Output","{}"'.format(idx + 1, pin, self.labels.get(pin, "")))
+        return "\n".join(lines) + "\n"
+
+    def library(self):
+        packages = []
+        for idx in range(self.library_size):
+            wires = "".join('<wire x1="{0}" y1="0" x2="{0}" y2="1" width="0.127" layer="21"/>'.format(w) for w in range(20))
+            pads = "".join('<smd name="{}" x="{}" y="0" dx="0.5" dy="1" layer="1"/>'.format(p, p) for p in range(8))
+            packages.append('<package name="PKG_{}">{}{}</package>'.format(idx, wires, pads))
+        return '<library name="synthetic"><packages>{}</packages><symbols/><devicesets/></library>'.format("".join(packages))
+
+    def sch(self):
+        parts = ['<part name="U1" library="synthetic" deviceset="STM32F429ZI" device="T6" value="STM32F429ZIT6"/>']
+        for idx in range(self.parts):
+            parts.append('<part name="R{}" library="synthetic" deviceset="R" device="0603" value="10k"/>'.format(idx))
+
+        nets = []
+        for idx, net in enumerate(self.net_names):
+            pinrefs = []
+            if idx < len(self.pin_names):
+                pinrefs.append('<pinref part="U1" gate="G$1" pin="{}"/>'.format(self.pin_names[idx]))
+            pinrefs.append('<pinref part="{}" gate="G$1" pin="1"/>'.format(self.getPartForNet(idx)))
+            wires = "".join('<wire x1="{0}" y1="0" x2="{0}" y2="2.54" width="0.1524" layer="91"/>'.format(w) for w in range(4))
+            nets.append('<net name="{}" class="0"><segment>{}{}</segment></net>'.format(net, "".join(pinrefs), wires))
+
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<!DOCTYPE eagle SYSTEM "eagle.dtd">\n'
+            '<eagle version="9.6.2"><drawing><settings/><layers/><schematic>'
+            '<libraries>{}</libraries><parts>{}</parts>'
+            '<sheets><sheet><instances/><nets>{}</nets></sheet></sheets>'
+            '</schematic></drawing></eagle>\n'
+        ).format(self.library(), "".join(parts), "".join(nets))
+
+    def brd(self):
+        signals = []
+        for idx, net in enumerate(self.net_names):
+            contacts = ['<contactref element="{}" pad="1"/>'.format(self.getPartForNet(idx))]
+            if idx < len(self.pin_names):
+                contacts.append('<contactref element="U1" pad="{}"/>'.format(idx + 1))
+            wires = "".join('<wire x1="{0}" y1="0" x2="{0}" y2="1" width="0.2" layer="1"/>'.format(w) for w in range(8))
+            signals.append('<signal name="{}">{}{}</signal>'.format(net, "".join(contacts), wires))
+
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<!DOCTYPE eagle SYSTEM "eagle.dtd">\n'
+            '<eagle version="9.6.2"><drawing><settings/><layers/><board>'
+            '<libraries>{}</libraries><elements/><signals>{}</signals>'
+            '</board></drawing></eagle>\n'
+        ).format(self.library(), "".join(signals))
@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from data.loaderRegistry import KNOWN_FILE_EXT_LOADER
+from data.dataModel import TargetNetContainer, Instrumentation
+from data.cache import FILE_CACHE
+from data.diskCache import DiskCache
+from data.mappedFile import ENCODING
+
+class JobFailed(Exception):
+    pass
+
+class STM32CubeMX_Input:
+    TARGET_KEYS = ("file",)
+
+    def __init__(self, file):
+        self.file = file
+        _, ext = os.path.splitext(file)
+        if ext not in KNOWN_FILE_EXT_LOADER or ext in (".sch", ".brd"):
+            raise JobFailed("Can't handle files with extension \"{}\".".format(ext))
+        self.loader = KNOWN_FILE_EXT_LOADER[ext]
+
+    def getFiles(self):
+        return [self.file]
+
+    def getModel(self, instrumentation):
+        return FILE_CACHE.get(self.file, instrumentation).getModel(self.loader, instrumentation=instrumentation)
+
+    def apply(self, target_net_container, instrumentation, target=None):
+        document = FILE_CACHE.get(self.file, instrumentation).getDocument(self.loader, instrumentation)
+        return self.loader.applyOperation(document, target_net_container, instrumentation=instrumentation)
+
+    def write(self, target, operation_result):
+        with open(target["file"], "w", encoding=ENCODING) as f:
+            f.write(operation_result.content)
+
+class AutodeskEagle_Input:
+    TARGET_KEYS = ("schematic", "board")
+
+    def __init__(self, schematic, ic, board=None):
+        self.schematic = schematic
+        self.board = board
+        self.ic = ic
+        self.loader = KNOWN_FILE_EXT_LOADER[".sch"]
+
+    def getFiles(self):
+        return [self.schematic] if self.board is None else [self.schematic, self.board]
+
+    def getModel(self, instrumentation):
+        return FILE_CACHE.get(self.schematic, instrumentation).getModel(self.loader, self.ic, instrumentation=instrumentation)
+
+    def apply(self, target_net_container, instrumentation, target=None):
+        return self.applyParts([(self.ic, target_net_container)], instrumentation, target)
+
+    def applyParts(self, targets, instrumentation, target=None):
+        if self.board is None:
+            raise JobFailed("An Autodesk Eagle sink needs a board file.")
+        schematic = FILE_CACHE.get(self.schematic, instrumentation).getDocument(self.loader, instrumentation)
+        board = FILE_CACHE.get(self.board, instrumentation).content
+        if target is None or "board" not in target:
+            return self.loader.applyOperations(schematic, board, targets, instrumentation=instrumentation)
+
+        # the board is streamed into a temporary file next to its target, which
+        # replaces the target on write, so it is never held in memory
+        board_out = tempfile.NamedTemporaryFile("w", encoding=ENCODING, dir=os.path.dirname(target["board"]), suffix=".tmp", delete=False)
+        try:
+            with board_out:
+                operation_result = self.loader.applyOperations(schematic, board, targets, instrumentation=instrumentation, board_out=board_out)
+        except BaseException:
+            os.remove(board_out.name)
+            raise
+        operation_result.content["brd"] = board_out.name
+        return operation_result
+
+    def write(self, target, operation_result):
+        try:
+            with open(target["schematic"], "w", encoding=ENCODING) as f:
+                f.write(operation_result.content["sch"])
+            # the temporary file is only readable by the owner, the board keeps
+            # the mode of the file it replaces or, for a new one, of the sink board
+            mode_source = target["board"] if os.path.exists(target["board"]) else self.board
+            shutil.copymode(mode_source, operation_result.content["brd"])
+        except BaseException:
+            os.remove(operation_result.content["brd"])
+            raise
+        os.replace(operation_result.content["brd"], target["board"])
+
+def createInput(description, base_dir):
+    def path(key):
+        if key not in description:
+            return None
+        return os.path.join(base_dir, description[key])
+
+    if "file" in description:
+        return STM32CubeMX_Input(path("file"))
+    if "schematic" in description and "ic" in description:
+        return AutodeskEagle_Input(path("schematic"), description["ic"], path("board"))
+    raise JobFailed("Unknown input description {}.".format(json.dumps(description)))
+
+def createSink(description, target, base_dir):
+    # a target that the sink can't write is found before anything is run
+    sink = createInput(description, base_dir)
+    if target is not None:
+        missing = [key for key in sink.TARGET_KEYS if key not in target]
+        if len(missing) > 0:
+            raise JobFailed("The target of this sink has no \"{}\" entry.".format("\", \"".join(missing)))
+    return sink
+
+class Job:
+    def __init__(self, name, source, sink, target, base_dir):
+        self.name = name
+        self.source = source
+        self.sink = sink
+        self.target = target
+        self.base_dir = base_dir
+
+    @staticmethod
+    def fromDict(idx, entry, base_dir):
+        if "parts" in entry:
+            return MultiPartJob(
+                entry.get("name", "job {}".format(idx)),
+                entry["parts"],
+                entry["sink"],
+                entry.get("target"),
+                base_dir
+            )
+        return Job(
+            entry.get("name", "job {}".format(idx)),
+            entry["source"],
+            entry["sink"],
+            entry.get("target"),
+            base_dir
+        )
+
+    def run(self, dry_run, instrumentation):
+        source = createInput(self.source, self.base_dir)
+        sink = createSink(self.sink, self.target, self.base_dir)
+
+        source_model = source.getModel(instrumentation)
+        sink_model = sink.getModel(instrumentation)
+        with instrumentation.phase(Instrumentation.MERGE):
+            tnn = TargetNetContainer.fromNNC(sink_model, source_model)
+        target = self.getTarget(dry_run)
+        operation_result = sink.apply(tnn, instrumentation, target)
+        self.write(sink, target, operation_result, instrumentation)
+        return operation_result
+
+    def getTarget(self, dry_run):
+        if self.target is None or dry_run:
+            return None
+        return {key: os.path.join(self.base_dir, value) for key, value in self.target.items()}
+
+    def write(self, sink, target, operation_result, instrumentation):
+        if target is not None and operation_result.successfull:
+            with instrumentation.phase(Instrumentation.WRITE):
+                sink.write(target, operation_result)
+
+# several STM32 of one Autodesk Eagle design, each part has its own source;
+# schematic and board are parsed and written once for all of them
+class MultiPartJob(Job):
+    def __init__(self, name, parts, sink, target, base_dir):
+        super().__init__(name, None, sink, target, base_dir)
+        self.parts = parts
+
+    def run(self, dry_run, instrumentation):
+        if "schematic" not in self.sink:
+            raise JobFailed("Only an Autodesk Eagle sink can take several parts.")
+
+        targets = []
+        for part in self.parts:
+            source = createInput(part["source"], self.base_dir)
+            sink = createSink(dict(self.sink, ic=part["ic"]), self.target, self.base_dir)
+
+            source_model = source.getModel(instrumentation)
+            sink_model = sink.getModel(instrumentation)
+            with instrumentation.phase(Instrumentation.MERGE):
+                targets.append((part["ic"], TargetNetContainer.fromNNC(sink_model, source_model)))
+
+        target = self.getTarget(dry_run)
+        operation_result = sink.applyParts(targets, instrumentation, target)
+        self.write(sink, target, operation_result, instrumentation)
+        return operation_result
+
+# plain, picklable summary of one job that is sent back from the worker processes
+class JobResult:
+    def __init__(self, name):
+        self.name = name
+        self.log = []
+        self.errors = []
+        self.warnings = []
+        self.failure = None
+        self.performance = []
+
+def runJob(job, dry_run, trace_memory=False, disk_cache=None):
+    result = JobResult(job.name)
+    # worker processes don't inherit the setting from the parent
+    FILE_CACHE.setDiskCache(disk_cache)
+    instrumentation = Instrumentation()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    try:
+        operation_result = job.run(dry_run, instrumentation)
+    except (JobFailed, OSError) as e:
+        result.failure = str(e) + "\n"
+        return result
+    except Exception:
+        result.failure = traceback.format_exc()
+        return result
+    finally:
+        result.performance = instrumentation.toDict()
+
+    result.log = [(str(entry.name), str(entry.net), str(entry.new_net)) for entry in operation_result.log]
+    result.errors = list(operation_result.errors)
+    result.warnings = list(operation_result.warnings)
+    return result
+
+def loadManifest(path):
+    with open(path, encoding=ENCODING) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest["jobs"]
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return [Job.fromDict(idx, entry, base_dir) for idx, entry in enumerate(manifest)]
+
+def printResult(result, out):
+    if result.failure is not None:
+        out.write("[FAILED] {}\n".format(result.name))
+        out.write("    " + result.failure)
+        return False
+    out.write("[{}] {}: {} renamed, {} errors, {} warnings\n".format(
+        "ERROR" if len(result.errors) > 0 else "OK",
+        result.name,
+        len(result.log),
+        len(result.errors),
+        len(result.warnings)
+    ))
+    for pin, net, new_net in result.log:
+        out.write("    {}: {} => {}\n".format(pin, net, new_net))
+    for line in result.errors:
+        out.write("    Error: {}\n".format(line))
+    for line in result.warnings:
+        out.write("    Warning: {}\n".format(line))
+    return len(result.errors) == 0
+
+def printSummary(results, out):
+    failed = 0
+    for result in results:
+        if not printResult(result, out):
+            failed += 1
+    out.write("{} jobs, {} with errors\n".format(len(results), failed))
+    return failed
+
+# keeps the inputs of one job and re-syncs it whenever one of its files
+# changes; the file cache keeps the models of the unchanged files, so only
+# the modified file is parsed again
+class JobWatcher:
+    def __init__(self, job):
+        if isinstance(job, MultiPartJob):
+            raise JobFailed("Jobs with several parts can't be watched.")
+        self.job = job
+        self.source = createInput(job.source, job.base_dir)
+        self.sink = createSink(job.sink, job.target, job.base_dir)
+        self.files = self.source.getFiles() + self.sink.getFiles()
+        self.__keys = {}
+        self.__synced = set()
+
+    def getKeys(self):
+        keys = {}
+        for path in self.files:
+            try:
+                keys[path] = FILE_CACHE.getKey(path)
+            except OSError:
+                # editors often replace files, the new one is seen by the next poll
+                keys[path] = None
+        return keys
+
+    def poll(self):
+        keys = self.getKeys()
+        changed = [path for path in self.files if keys[path] != self.__keys.get(path)]
+        self.__keys = keys
+        return changed
+
+    def sync(self, dry_run, instrumentation):
+        source_model = self.source.getModel(instrumentation)
+        sink_model = self.sink.getModel(instrumentation)
+        with instrumentation.phase(Instrumentation.MERGE):
+            tnn = TargetNetContainer.fromNNC(sink_model, source_model)
+            pending = TargetNetContainer.filterGood(tnn)
+            changed = [entry for entry in pending if entry.getKey() not in self.__synced]
+
+        operation_result = None
+        if len(changed) > 0:
+            # the whole container is applied, a target beside the sink has to
+            # contain the earlier renames too, an updated sink has no pending
+            # renames besides the changed ones anyway
+            target = self.job.getTarget(dry_run)
+            operation_result = self.sink.apply(tnn, instrumentation, target)
+            self.job.write(self.sink, target, operation_result, instrumentation)
+            # the own writes don't trigger another sync
+            self.__keys = self.getKeys()
+        self.__synced = set(entry.getKey() for entry in pending)
+        return changed, operation_result
+
+def watchJob(watcher, dry_run):
+    result = JobResult(watcher.job.name)
+    instrumentation = Instrumentation()
+    try:
+        changed, operation_result = watcher.sync(dry_run, instrumentation)
+    except (JobFailed, OSError) as e:
+        result.failure = str(e) + "\n"
+        return result
+    except Exception:
+        result.failure = traceback.format_exc()
+        return result
+    finally:
+        result.performance = instrumentation.toDict()
+
+    result.log = [(str(entry.name), str(entry.net), str(entry.new_net)) for entry in changed]
+    if operation_result is not None:
+        result.errors = list(operation_result.errors)
+        result.warnings = list(operation_result.warnings)
+    return result
+
+def watch(jobs, dry_run, interval, out):
+    watchers = []
+    for job in jobs:
+        try:
+            watchers.append(JobWatcher(job))
+        except JobFailed as e:
+            out.write("[FAILED] {}\n    {}\n".format(job.name, e))
+    out.write("Watching {} jobs, press Ctrl+C to stop\n".format(len(watchers)))
+    out.flush()
+
+    try:
+        while True:
+            for watcher in watchers:
+                changed = watcher.poll()
+                if len(changed) == 0:
+                    continue
+                out.write("{} changed\n".format(", ".join(os.path.basename(path) for path in changed)))
+                printResult(watchJob(watcher, dry_run), out)
+                out.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def Run(argv):
+    parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]), description="Synchronize pin labels between STM32CubeMX and Autodesk Eagle without GUI.")
+    parser.add_argument("manifest", help="JSON file with a list of jobs, each with a source, a sink and an optional target")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="don't write any target file")
+    parser.add_argument("--performance", metavar="FILE", help="write the time and memory used per job and phase as JSON")
+    parser.add_argument("--trace-memory", action="store_true", help="record the peak memory per phase (Python 3.9 or newer), slows down the jobs")
+    parser.add_argument("-w", "--watch", action="store_true", help="keep running and re-sync the jobs whenever one of their files changes")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between two checks for changed files in watch mode")
+    parser.add_argument("--disk-cache", metavar="FILE", default=DiskCache.getDefaultPath(), help="SQLite file that keeps the extracted models between runs")
+    parser.add_argument("--no-disk-cache", action="store_true", help="always extract the models from the files")
+    args = parser.parse_args(argv[1:])
+
+    jobs = loadManifest(args.manifest)
+    disk_cache = None if args.no_disk_cache else DiskCache(args.disk_cache)
+
+    if args.watch:
+        FILE_CACHE.setDiskCache(disk_cache)
+        return watch(jobs, args.dry_run, args.interval, sys.stdout)
+
+    if args.jobs <= 1 or len(jobs) <= 1:
+        results = [runJob(job, args.dry_run, args.trace_memory, disk_cache) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(runJob, jobs, [args.dry_run] * len(jobs), [args.trace_memory] * len(jobs), [disk_cache] * len(jobs)))
+
+    failed = printSummary(results, sys.stdout)
+
+    if args.performance is not None:
+        with open(args.performance, "w") as f:
+            json.dump([{"name": result.name, "phases": result.performance} for result in results], f, indent=4)
+    return 1 if failed > 0 else 0
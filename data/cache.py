@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .dataModel import Instrumentation
+from .mappedFile import MappedFile
+from .diskCache import DiskCache
+
+# rough memory use of a parsed document (tree and index) per byte of its file
+# and of a model or part list per entry, taken with tracemalloc on the
+# benchmark project; the mapped file itself stays in the page cache
+DOCUMENT_SIZE_FACTOR = 10
+ENTRY_SIZE = 1024
+
+class CacheEntry:
+    def __init__(self, path, content, disk_cache=None):
+        self.path = path
+        self.content = content
+        self.disk_cache = disk_cache
+        self.__content_hash = None
+        self.__documents = {}
+        self.__models = {}
+        self.__part_lists = {}
+
+    def getSize(self):
+        # the entry grows with every document, model and part list it caches;
+        # the lists are copied as other threads may add to them
+        size = len(list(self.__documents)) * DOCUMENT_SIZE_FACTOR * len(self.content)
+        size += sum(len(model) for model in list(self.__models.values())) * ENTRY_SIZE
+        size += sum(len(part_list) for part_list in list(self.__part_lists.values())) * ENTRY_SIZE
+        return size
+
+    def getDocument(self, loader, instrumentation=None):
+        if loader not in self.__documents:
+            with (instrumentation or Instrumentation()).phase(Instrumentation.PARSE):
+                self.__documents[loader] = loader.parse(self.content)
+        return self.__documents[loader]
+
+    def getDiskKey(self, loader, kind, *args):
+        if self.__content_hash is None:
+            self.__content_hash = DiskCache.getContentHash(self.content)
+        return DiskCache.getKey(self.__content_hash, loader, kind, *args)
+
+    def getPartList(self, loader, pin_counts=True):
+        # the pin counts need a scan of the libraries, so both lists are kept
+        part_list = self.__part_lists.get(pin_counts)
+        disk_key = None
+        if part_list is None and self.disk_cache is not None:
+            disk_key = self.getDiskKey(loader, "part_list", pin_counts)
+            part_list = self.disk_cache.get(disk_key)
+        if part_list is None:
+            # scan the raw file as long as it hasn't been parsed completely
+            if loader in self.__documents:
+                part_list = loader.getPartList(self.__documents[loader], pin_counts)
+            else:
+                part_list = loader.getPartList(self.content, pin_counts)
+            if disk_key is not None:
+                self.disk_cache.put(disk_key, part_list)
+        self.__part_lists[pin_counts] = part_list
+        return list(part_list)
+
+    def getICList(self, loader):
+        return [part[0] for part in self.getPartList(loader, False)]
+
+    def getModel(self, loader, *args, instrumentation=None):
+        key = (loader,) + args
+        if key not in self.__models:
+            with (instrumentation or Instrumentation()).phase(Instrumentation.MODEL):
+                disk_key = None
+                if self.disk_cache is not None:
+                    disk_key = self.getDiskKey(loader, "model", *args)
+                    model = self.disk_cache.get(disk_key)
+                    if model is not None:
+                        self.__models[key] = model
+                        return model
+            document = self.getDocument(loader, instrumentation)
+            with (instrumentation or Instrumentation()).phase(Instrumentation.MODEL):
+                self.__models[key] = loader.getModel(document, *args)
+                if disk_key is not None:
+                    self.disk_cache.put(disk_key, self.__models[key])
+        return self.__models[key]
+
+class FileCache:
+    def __init__(self, max_size, max_entries):
+        self.__max_size = max_size
+        self.__max_entries = max_entries
+        self.__entries = OrderedDict()
+        self.__keys_by_path = {}
+        self.__lock = threading.Lock()
+        self.disk_cache = None
+
+    def setDiskCache(self, disk_cache):
+        # entries that already exist keep working without the disk cache
+        self.disk_cache = disk_cache
+
+    @staticmethod
+    def getKey(path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, instrumentation=None):
+        key = FileCache.getKey(path)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+                self.__evict()
+                return entry
+
+        with (instrumentation or Instrumentation()).phase(Instrumentation.READ):
+            entry = CacheEntry(key[0], MappedFile(key[0]), self.disk_cache)
+
+        with self.__lock:
+            # a changed file replaces only its own outdated entry
+            old_key = self.__keys_by_path.get(key[0])
+            if old_key is not None:
+                self.__remove(old_key)
+            self.__entries[key] = entry
+            self.__keys_by_path[key[0]] = key
+            self.__evict()
+        return entry
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__keys_by_path.clear()
+
+    def __evict(self):
+        # entries grow after they are added, so the sizes are taken anew; the
+        # most recent entry is always kept
+        sizes = [entry.getSize() for entry in self.__entries.values()]
+        size = sum(sizes)
+        for entry_size in sizes[:-1]:
+            if size <= self.__max_size and len(self.__entries) <= self.__max_entries:
+                break
+            self.__remove(next(iter(self.__entries)))
+            size -= entry_size
+
+    def __remove(self, key):
+        self.__entries.pop(key)
+        del self.__keys_by_path[key[0]]
+
+FILE_CACHE = FileCache(256 * 1024 * 1024, 32)
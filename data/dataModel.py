@@ -1,13 +1,43 @@
 import os
+import sys
+import time
+import weakref
+from contextlib import contextmanager
 
+# immutable and hashable, equal names share one object and compare equal to
+# their escaped name as str
 class Name:
-    def __init__(self, real_name, escaped_name):
-        self.real_name = real_name
-        self.escaped_name = escaped_name
+    __slots__ = ("real_name", "escaped_name", "__weakref__")
+    __interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, real_name, escaped_name):
+        key = (real_name, escaped_name)
+        name = Name.__interned.get(key)
+        if name is None:
+            name = super().__new__(cls)
+            object.__setattr__(name, "real_name", sys.intern(real_name) if isinstance(real_name, str) else real_name)
+            object.__setattr__(name, "escaped_name", sys.intern(escaped_name) if isinstance(escaped_name, str) else escaped_name)
+            Name.__interned[key] = name
+        return name
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Name is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("Name is immutable")
+
+    def __reduce__(self):
+        return Name, (self.real_name, self.escaped_name)
 
     def __str__(self):
         return self.escaped_name
 
+    def __repr__(self):
+        return "Name({!r}, {!r})".format(self.real_name, self.escaped_name)
+
+    def __hash__(self):
+        return hash(self.escaped_name)
+
     def __eq__(self, other):
         if isinstance(other, str):
             return self.escaped_name == other
@@ -16,20 +46,133 @@ class Name:
         elif other is None:
             return False
         else:
-            raise NotImplementedError()
+            return NotImplemented
 
     def __ne__(self, other):
-        return not self.__eq__(other)
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
 
 class NamedNetEntry:
+    __slots__ = ("name", "net")
+
     def __init__(self, name, net):
-        self.name = name
-        self.net = net
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "net", net)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __delattr__(self, key):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __reduce__(self):
+        return NamedNetEntry, (self.name, self.net)
+
+    def getKey(self):
+        return (self.name, self.net)
+
+    def __hash__(self):
+        return hash(self.getKey())
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.getKey() == other.getKey()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
 
     def __str__(self):
         return "{}: {}".format(str(self.name), str(self.net))
 
 class NamedNetContainer(list):
+    def __init__(self, iterable=()):
+        super().__init__()
+        self._index = {}
+        self._entries = set()
+        for entry in iterable:
+            self.append(entry)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    def _addToIndex(self, entry):
+        # the first entry with a name wins, like the former linear search
+        self._index.setdefault(str(entry.name), entry)
+        self._entries.add(entry)
+
+    def _reindex(self):
+        # every change besides appending may move the first entry of a name
+        self._index = {}
+        self._entries = set()
+        for entry in self:
+            self._addToIndex(entry)
+
+    def append(self, entry):
+        super().append(entry)
+        self._addToIndex(entry)
+
+    def insert(self, idx, entry):
+        super().insert(idx, entry)
+        self._reindex()
+
+    def __setitem__(self, idx, value):
+        super().__setitem__(idx, value)
+        self._reindex()
+
+    def __delitem__(self, idx):
+        super().__delitem__(idx)
+        self._reindex()
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def __imul__(self, count):
+        super().__imul__(count)
+        self._reindex()
+        return self
+
+    def pop(self, idx=-1):
+        entry = super().pop(idx)
+        self._reindex()
+        return entry
+
+    def remove(self, entry):
+        super().remove(entry)
+        self._reindex()
+
+    def clear(self):
+        super().clear()
+        self._reindex()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._reindex()
+
+    def reverse(self):
+        super().reverse()
+        self._reindex()
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    def getNames(self):
+        # a set like view, e.g. for intersections with other containers
+        return self._index.keys()
+
+    def getEntriesByName(self):
+        return dict(self._index)
+
+    def extend(self, iterable):
+        for entry in iterable:
+            self.append(entry)
+
     def addEntry(self, name, net):
         self.append(NamedNetEntry(name, net))
 
@@ -45,15 +188,22 @@ class NamedNetContainer(list):
         return NamedNetContainer( filter(lambda e: e.net is None, source))
 
     def getEntryByName(self, name):
-        for entry in self:
-            if entry.name == name:
-                return entry
-        return None
+        if name is None:
+            return None
+        return self._index.get(str(name))
 
 class RenamedNetEntry(NamedNetEntry):
+    __slots__ = ("new_net",)
+
     def __init__(self, name, net, new_net):
         super().__init__(name, net)
-        self.new_net = new_net
+        object.__setattr__(self, "new_net", new_net)
+
+    def __reduce__(self):
+        return RenamedNetEntry, (self.name, self.net, self.new_net)
+
+    def getKey(self):
+        return (self.name, self.net, self.new_net)
 
     def __str__(self):
         return "{}: {} => {}".format(str(self.name), str(self.net), str(self.new_net))
@@ -61,15 +211,24 @@ class RenamedNetEntry(NamedNetEntry):
 class TargetNetContainer(NamedNetContainer):
     @staticmethod
     def fromNNC(from_nets, to_nets):
+        # entries are immutable, so the new nets are collected first: the last
+        # net of a name wins and only the first entry of a name receives it
+        new_nets = {}
+        for entry in to_nets:
+            key = str(entry.name)
+            name = new_nets[key][0] if key in new_nets else entry.name
+            new_nets[key] = (name, entry.net)
+
         tnc = TargetNetContainer()
         for entry in from_nets:
-            tnc.addEntry(entry.name, entry.net, None)
-        for entry in to_nets:
-            base = tnc.getEntryByName(entry.name)
-            if base is not None:
-                base.new_net = entry.net
-            else:
-                tnc.addEntry(entry.name, None, entry.net)
+            key = str(entry.name)
+            new_net = None
+            if tnc.getEntryByName(key) is None and key in new_nets:
+                new_net = new_nets[key][1]
+            tnc.addEntry(entry.name, entry.net, new_net)
+        for key, (name, net) in new_nets.items():
+            if tnc.getEntryByName(key) is None:
+                tnc.addEntry(name, None, net)
         return tnc
 
     @staticmethod
@@ -79,10 +238,79 @@ class TargetNetContainer(NamedNetContainer):
     def addEntry(self, name, net, new_net):
         self.append(RenamedNetEntry(name, net, new_net))
 
+class OperationCanceled(Exception):
+    pass
+
+class PhaseTiming:
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = None
+        self.calls = 0
+
+    def toDict(self):
+        return {
+            "phase": self.name,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_memory": self.peak_memory,
+            "calls": self.calls
+        }
+
+# collects wall time, CPU time of the calling thread and, if tracemalloc is
+# tracing, the peak memory per phase; a phase entered several times adds up
+class Instrumentation:
+    READ = "read"
+    PARSE = "parse"
+    MODEL = "model extraction"
+    MERGE = "merge"
+    CONFLICTS = "conflict detection"
+    RENAME = "rename"
+    SERIALIZE = "serialize"
+    WRITE = "write"
+
+    def __init__(self, is_canceled=None):
+        self.phases = {}
+        # asked at the start of every phase and inside the long ones
+        self.is_canceled = is_canceled
+
+    def checkCanceled(self):
+        if self.is_canceled is not None and self.is_canceled():
+            raise OperationCanceled()
+
+    @contextmanager
+    def phase(self, name, cancelable=True):
+        # imported here, it isn't needed for the startup
+        import tracemalloc
+        if cancelable:
+            self.checkCanceled()
+        timing = self.phases.setdefault(name, PhaseTiming(name))
+        # without reset_peak (before Python 3.9) the peak would be the one
+        # since tracing started, not the one of the phase, so none is recorded
+        tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak")
+        if tracing:
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield timing
+        finally:
+            timing.wall_time += time.perf_counter() - wall_start
+            timing.cpu_time += time.thread_time() - cpu_start
+            timing.calls += 1
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                timing.peak_memory = peak if timing.peak_memory is None else max(timing.peak_memory, peak)
+
+    def toDict(self):
+        return [timing.toDict() for timing in self.phases.values()]
+
 class OperationContext:
-    def __init__(self):
+    def __init__(self, instrumentation=None):
         self.log = []
         self.errors = []
         self.warnings = []
         self.content = None
-        self.successfull = False
\ No newline at end of file
+        self.successfull = False
+        self.instrumentation = Instrumentation() if instrumentation is None else instrumentation
\ No newline at end of file
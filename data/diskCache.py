@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import hashlib
+from contextlib import closing
+
+from .mappedFile import MappedFile
+
+# persistent store for extracted models and IC lists, keyed by the content hash
+# of the file and the loader version, so known files aren't parsed again after
+# a restart; every failure of the store counts as a miss
+class DiskCache:
+    SCHEMA = "CREATE TABLE IF NOT EXISTS models (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+
+    def __init__(self, path, max_size=64 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+
+    @staticmethod
+    def getDefaultPath():
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Caches")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+        return os.path.join(base, "stm32cubemx-to-eagle", "models.sqlite")
+
+    @staticmethod
+    def getContentHash(content):
+        digest = hashlib.sha256()
+        if isinstance(content, MappedFile):
+            for chunk in content.chunks():
+                digest.update(chunk)
+        else:
+            digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def getKey(content_hash, loader, kind, *args):
+        # a loader raises its VERSION whenever its results change
+        from .pinAlias import PinAlias
+        parts = [content_hash, loader.__name__, str(loader.VERSION), PinAlias.getDataHash(), kind]
+        return "/".join(parts + [repr(arg) for arg in args])
+
+    def connect(self):
+        # one connection per call, the GUI worker thread and the CLI worker
+        # processes share the file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute(DiskCache.SCHEMA)
+        return connection
+
+    def get(self, key):
+        try:
+            with closing(self.connect()) as connection, connection:
+                row = connection.execute("SELECT value FROM models WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute("UPDATE models SET used = ? WHERE key = ?", (time.time(), key))
+        except (OSError, sqlite3.Error):
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            # a broken or outdated pickle may raise nearly anything, the row is
+            # dropped and the value extracted again
+            self.delete(key)
+            return None
+
+    def delete(self, key):
+        try:
+            with closing(self.connect()) as connection, connection:
+                connection.execute("DELETE FROM models WHERE key = ?", (key,))
+        except (OSError, sqlite3.Error):
+            pass
+
+    def put(self, key, value):
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            with closing(self.connect()) as connection, connection:
+                connection.execute("INSERT OR REPLACE INTO models (key, value, size, used) VALUES (?, ?, ?, ?)", (key, data, len(data), time.time()))
+                self.evict(connection)
+        except Exception:
+            pass
+
+    def evict(self, connection):
+        # least recently used entries go first
+        size = 0
+        outdated = []
+        for key, entry_size in connection.execute("SELECT key, size FROM models ORDER BY used DESC"):
+            size += entry_size
+            if size > self.max_size:
+                outdated.append((key,))
+        connection.executemany("DELETE FROM models WHERE key = ?", outdated)
+
+    def clear(self):
+        try:
+            with closing(self.connect()) as connection, connection:
+                connection.execute("DELETE FROM models")
+        except (OSError, sqlite3.Error):
+            pass
@@ -1,44 +1,60 @@
 import os
 import csv
 import io
-from .dataModel import NamedNetContainer, TargetNetContainer, OperationContext, Name
+import collections
+import re
+import html
+from contextlib import contextmanager
+from .dataModel import NamedNetContainer, TargetNetContainer, RenamedNetEntry, OperationContext, Instrumentation, Name
+from .mappedFile import MappedFile, ENCODING
+from .pinAlias import PinAlias, getFamily
+from .loaderRegistry import KNOWN_FILE_EXT_LOADER, FileFormatUnknown
 import xml.etree.cElementTree as ET
 
 class Loader:
     @staticmethod
-    def getModel(file_content):
+    def parse(file_content):
         pass
 
     @staticmethod
-    def applyOperation(file_content, target_container):
+    def getModel(file_content):
         pass
 
-class FileFormatUnknown(Exception):
-    pass
+    @staticmethod
+    def applyOperation(file_content, target_container, instrumentation=None):
+        pass
 
-class PinAlias:
-    register = None
+# tokenized .ioc file, every line is kept with its keys and value
+class STM32CubeMX_Document:
+    def __init__(self, file_content):
+        self.lines = []
+        self.family = None
+        if isinstance(file_content, MappedFile):
+            with file_content.openText() as f:
+                self.tokenize(STM32CubeMX_Document.splitLines(f))
+        else:
+            self.tokenize(file_content.split("\n"))
 
-    def __init__(self):
-        filename = "../settings/alternative_pin_names.csv"
-        if PinAlias.register is None:
-            self.loadData(filename)
-
-    def getIdForAlias(self, alias):
-        if alias in PinAlias.register:
-            return PinAlias.register[alias]
-        return alias
-
-    def loadData(self, filename):
-        PinAlias.register = {}
-        with open(os.path.dirname(__file__) + "/" + filename) as f:
-            reader = csv.reader(f, delimiter=",", quotechar='"')
-            for line in reader:
-                id_ = line[0]
-                for alias in line[1:]:
-                    PinAlias.register[alias] = id_
+    @staticmethod
+    def splitLines(f):
+        # yields the same lines as str.split("\n") on the whole content
+        line = ""
+        for line in f:
+            if line.endswith("\n"):
+                yield line[:-1]
+                line = ""
+        yield line
+
+    def tokenize(self, lines):
+        for line in lines:
+            keys, value = STM32CubeMX_Loader.parseLine(line)
+            self.lines.append((line, keys, value))
+            if keys == ["Mcu", "Family"]:
+                self.family = value
 
 class STM32CubeMX_Loader:
+    VERSION = 2
+
     @staticmethod
     def labelToNetName(label):
         if label == "":
@@ -63,13 +79,19 @@ class STM32CubeMX_Loader:
         value = parts[1]
         return keys, value
 
+    @staticmethod
+    def parse(file_content):
+        if isinstance(file_content, STM32CubeMX_Document):
+            return file_content
+        return STM32CubeMX_Document(file_content)
+
     @staticmethod
     def getModel(file_content):
         nnc = NamedNetContainer()
-        pa = PinAlias()
+        document = STM32CubeMX_Loader.parse(file_content)
+        pa = PinAlias(document.family)
 
-        for line in file_content.split("\n"):
-            keys, value = STM32CubeMX_Loader.parseLine(line)
+        for line, keys, value in document.lines:
             if len(keys) == 2 and keys[1] == "GPIO_Label":
                 nnc.addEntry(
                     Name(
@@ -85,19 +107,26 @@ class STM32CubeMX_Loader:
         return nnc
 
     @staticmethod
-    def applyOperation(file_content, targetContainer):
-        pa = PinAlias()
-        oc = OperationContext()
-        oc.content = []
+    def applyOperation(file_content, targetContainer, out=None, instrumentation=None):
+        oc = OperationContext(instrumentation)
+        phase = oc.instrumentation.phase
+        write_buffer = io.StringIO() if out is None else out
 
         goodContainer = list(filter(lambda entry: entry.new_net is not None and entry.net != entry.new_net, targetContainer))
 
-        def getEntryForSection(section):
-            section_id = pa.getIdForAlias(section)
-            for idx, entry in enumerate(goodContainer):
-                if entry.name == section_id:
-                    return entry, idx             
-            return None, None
+        # pending entries by pin id, every entry can be claimed by one section only
+        pending = {}
+        for entry in goodContainer:
+            pending.setdefault(str(entry.name), collections.deque()).append(entry)
+        claimed = set()
+
+        def claimEntryForSection(section):
+            entries = pending.get(pa.getIdForAlias(section))
+            if not entries:
+                return None
+            entry = entries.popleft()
+            claimed.add(id(entry))
+            return entry
 
         def getLabelForEntry(entry):
             label = str(entry.new_net)
@@ -106,61 +135,96 @@ class STM32CubeMX_Loader:
             else:
                 return label
 
+        first_line = True
+        def writeLine(line):
+            nonlocal first_line
+            if not first_line:
+                write_buffer.write("\n")
+            write_buffer.write(line)
+            first_line = False
+
         def addEntry(section):
-            e, idx = getEntryForSection(section)
+            e = claimEntryForSection(section)
             if e is not None:
-                del goodContainer[idx]
                 label = getLabelForEntry(e)
                 if label[0].isdigit():
                     oc.warnings.append("Can't assign label {} to {} cause it starts with a digit.".format(label, section))
                     return False
 
-                oc.content.append("{}.GPIO_Label={}".format(current_section, label))
+                writeLine("{}.GPIO_Label={}".format(current_section, label))
                 oc.log.append(e)
                 return True
             return False
 
-        current_section = None
-        section_used = False
-        for line in file_content.split("\n"):
-            keys, value = STM32CubeMX_Loader.parseLine(line)
-
-            if len(keys) >= 1:
-                ignore_line = False
-                # if this section is new ...
-                if current_section != keys[0]:
-                    # ... and the section before is valid but without a label
-                    if current_section is not None and section_used == False:
-                        addEntry(current_section)
-
-                    # save the new section
-                    section_used = False
-                    current_section = keys[0]
-
-                if len(keys) == 2 and keys[1] == "GPIO_Label":
-                    if addEntry(current_section):
-                        ignore_line = True
-                    section_used = True
-
-                if ignore_line == False:
-                    oc.content.append(line)
-            else:
-                oc.content.append(line)
-
-        for entry in goodContainer:
-            oc.errors.append("Can't assign label {} to {} cause the target pin is not configured.".format(entry.new_net, entry.name))
-
-        oc.content = "\n".join(oc.content)
+        with phase(Instrumentation.PARSE):
+            document = STM32CubeMX_Loader.parse(file_content)
+        pa = PinAlias(document.family)
+
+        with phase(Instrumentation.RENAME):
+            current_section = None
+            section_used = False
+            for line, keys, value in document.lines:
+                if len(keys) >= 1:
+                    ignore_line = False
+                    # if this section is new ...
+                    if current_section != keys[0]:
+                        # ... and the section before is valid but without a label
+                        if current_section is not None and section_used == False:
+                            addEntry(current_section)
+
+                        # save the new section
+                        section_used = False
+                        current_section = keys[0]
+
+                    if len(keys) == 2 and keys[1] == "GPIO_Label":
+                        if addEntry(current_section):
+                            ignore_line = True
+                        section_used = True
+
+                    if ignore_line == False:
+                        writeLine(line)
+                else:
+                    writeLine(line)
+
+            for entry in goodContainer:
+                if id(entry) not in claimed:
+                    oc.errors.append("Can't assign label {} to {} cause the target pin is not configured.".format(entry.new_net, entry.name))
+
+        if out is None:
+            with phase(Instrumentation.SERIALIZE):
+                oc.content = write_buffer.getvalue()
+            write_buffer.close()
         oc.successfull = True
         return oc
 
+# pin list exported by STM32CubeMX, rows are read once and never modified
+class STM32CubeMX_CSV_Document:
+    def __init__(self, file_content):
+        if isinstance(file_content, MappedFile):
+            with file_content.openText() as f:
+                self.readRows(f)
+        else:
+            self.readRows(io.StringIO(file_content))
+
+    def readRows(self, f):
+        reader = csv.DictReader(f, delimiter=",", quotechar='"')
+        self.rows = list(reader)
+        self.fieldnames = reader.fieldnames
+
 class STM32CubeMX_CSV_Loader:
+    VERSION = 2
+
+    @staticmethod
+    def parse(file_content):
+        if isinstance(file_content, STM32CubeMX_CSV_Document):
+            return file_content
+        return STM32CubeMX_CSV_Document(file_content)
+
     @staticmethod
     def getModel(file_content):
-        reader = csv.DictReader(io.StringIO(file_content), delimiter=",", quotechar='"')
         nnc = NamedNetContainer()
         pa = PinAlias()
-        for line in reader:
+        for line in STM32CubeMX_CSV_Loader.parse(file_content).rows:
             name = line["Name"]
             label = line["Label"]
             
@@ -180,66 +244,331 @@ class STM32CubeMX_CSV_Loader:
         return nnc
 
     @staticmethod
-    def applyOperation(file_content, targetContainer):
-        write_buffer = io.StringIO()
-        reader = csv.DictReader(io.StringIO(file_content), delimiter=",", quotechar='"')
-        writer = csv.DictWriter(write_buffer, reader.fieldnames, delimiter=",", quotechar='"', quoting=csv.QUOTE_ALL, lineterminator="\r")
+    def getRows(file_content):
+        # file objects are streamed row by row, everything else is parsed
+        if hasattr(file_content, "read") and not isinstance(file_content, MappedFile):
+            reader = csv.DictReader(file_content, delimiter=",", quotechar='"')
+            return reader.fieldnames, reader
+        document = STM32CubeMX_CSV_Loader.parse(file_content)
+        return document.fieldnames, document.rows
+
+    @staticmethod
+    def applyOperation(file_content, targetContainer, out=None, instrumentation=None):
+        write_buffer = io.StringIO() if out is None else out
         pa = PinAlias()
-        oc = OperationContext()
+        oc = OperationContext(instrumentation)
+        phase = oc.instrumentation.phase
 
-        writer.writeheader()
+        with phase(Instrumentation.PARSE):
+            fieldnames, rows = STM32CubeMX_CSV_Loader.getRows(file_content)
+        writer = csv.DictWriter(write_buffer, fieldnames, delimiter=",", quotechar='"', quoting=csv.QUOTE_ALL, lineterminator="\r")
 
-        for line in reader:
-            line_id = pa.getIdForAlias(line["Name"])
+        with phase(Instrumentation.RENAME):
+            entries_by_id = {}
             for entry in targetContainer:
-                if entry.new_net is not None and line_id == entry.name:
+                if entry.new_net is not None:
+                    entries_by_id.setdefault(entry.name.escaped_name, []).append(entry)
+
+            writer.writeheader()
+
+            for line in rows:
+                line = dict(line)
+                for entry in entries_by_id.get(pa.getIdForAlias(line["Name"]), ()):
                     line["Label"] = entry.new_net.escaped_name
                     oc.log.append(entry)
 
-            if len(line["Label"]) > 0 and line["Label"][0] == "!":
-                line["Label"] = "_" + line["Label"][1:]
-            writer.writerow(line)
+                if len(line["Label"]) > 0 and line["Label"][0] == "!":
+                    line["Label"] = "_" + line["Label"][1:]
+                writer.writerow(line)
 
-        oc.content = write_buffer.getvalue()
+        if out is None:
+            with phase(Instrumentation.SERIALIZE):
+                oc.content = write_buffer.getvalue()
+            write_buffer.close()
         oc.successfull = True
-        write_buffer.close()
         return oc
 
+# maps every part to its (pin, net) pairs, built in one walk over all nets and
+# reusable for several parts of the same schematic
+class AutodeskEagle_SCH_Index:
+    def __init__(self, xml):
+        self.__devices = {}
+        for node in xml.iter("part"):
+            self.__devices[node.attrib["name"]] = (node.attrib.get("value", ""), node.attrib.get("deviceset", ""))
+        self.__parts = {}
+        for net in xml.iter("net"):
+            net_name = net.attrib["name"]
+            for node in net.iter("pinref"):
+                pins = self.__parts.setdefault(node.attrib["part"], {})
+                # a dict keeps the document order and drops pins that are
+                # referenced by several segments of the same net
+                pins[(node.attrib["pin"], net_name)] = None
+
+    def getParts(self):
+        return list(self.__parts.keys())
+
+    def getPins(self, part):
+        return list(self.__parts.get(part, ()))
+
+    def getFamily(self, part):
+        value, deviceset = self.__devices.get(part, ("", ""))
+        return getFamily(value) or getFamily(deviceset)
+
+# counts the occurrences of every net name in the schematic (<net> per sheet)
+# and the board (<signal>), so every conflict check is a set lookup
+class AutodeskEagle_NetTable:
+    def __init__(self):
+        self.schematic = collections.Counter()
+        self.board = collections.Counter()
+
+    def __contains__(self, name):
+        return name in self.schematic or name in self.board
+
+    def addSchematic(self, xml):
+        for node in xml.iter("net"):
+            self.schematic[node.attrib["name"]] += 1
+
+    def addBoard(self, board):
+        if isinstance(board, str):
+            self.addBoardText(board)
+        elif isinstance(board, MappedFile):
+            with board.openText() as f:
+                for piece in AutodeskEagle_SCH_Loader.splitTags(f):
+                    self.addBoardText(piece)
+        elif hasattr(board, "read"):
+            # an open board file is read again by the rename, one that can't
+            # seek back is left out
+            if not board.seekable():
+                return False
+            position = board.tell()
+            for piece in AutodeskEagle_SCH_Loader.splitTags(board):
+                self.addBoardText(piece)
+            board.seek(position)
+        else:
+            for node in board.iter("signal"):
+                self.board[node.attrib["name"]] += 1
+        return True
+
+    def addBoardText(self, text):
+        for match in AutodeskEagle_SCH_Loader.SIGNAL_NAME_RE.finditer(text):
+            self.board[html.unescape(match.group(3))] += 1
+
+    def findConflicts(self, rename_map):
+        # returns {old name: (new name, other old name or None)} of all renames
+        # that collide: the new name stays with a net that isn't renamed, or
+        # several nets get the same new name; a rejected rename keeps its old
+        # name, so the check runs until nothing changes
+        rejected = {}
+        changed = True
+        while changed:
+            changed = False
+            claimed_by = {}
+            for old_name, new_name in rename_map.items():
+                if old_name in rejected:
+                    continue
+                if new_name in self and (new_name not in rename_map or new_name in rejected):
+                    rejected[old_name] = (new_name, None)
+                    changed = True
+                elif new_name in claimed_by:
+                    rejected[old_name] = (new_name, claimed_by[new_name])
+                    changed = True
+                else:
+                    claimed_by[new_name] = old_name
+        return rejected
+
+# orders the renames of a rename map: old -> new is a graph where every net
+# has one new name and, after the conflict check, every new name one old net,
+# so it splits into chains (A -> B -> C) and cycles (swaps, rotations)
+class AutodeskEagle_RenamePlan:
+    TEMP_NAME = "tmp_net_name_{}"
+
+    def __init__(self, rename_map):
+        self.mapping = {old_name: new_name for old_name, new_name in rename_map.items() if old_name != new_name}
+        self.__renamed_from = {new_name: old_name for old_name, new_name in self.mapping.items()}
+        self.chains = []
+        self.cycles = []
+        visited = set()
+        for old_name, new_name in self.mapping.items():
+            if new_name in self.mapping:
+                continue
+            # the end of a chain gets a free name, the nets before it follow
+            chain = [old_name]
+            while chain[-1] in self.__renamed_from:
+                chain.append(self.__renamed_from[chain[-1]])
+            visited.update(chain)
+            self.chains.append(chain)
+        for old_name in self.mapping:
+            if old_name in visited:
+                continue
+            cycle = [old_name]
+            visited.add(old_name)
+            while self.mapping[cycle[-1]] not in visited:
+                cycle.append(self.mapping[cycle[-1]])
+                visited.add(cycle[-1])
+            self.cycles.append(cycle)
+
+    def getSteps(self, taken=()):
+        # renames one net after the other: chains need no temporary name,
+        # every cycle needs exactly one
+        steps = []
+        for chain in self.chains:
+            steps.extend((old_name, self.mapping[old_name]) for old_name in chain)
+        idx = 0
+        for cycle in self.cycles:
+            temp_name = AutodeskEagle_RenamePlan.TEMP_NAME.format(idx)
+            while temp_name in taken or temp_name in self.mapping or temp_name in self.__renamed_from:
+                idx += 1
+                temp_name = AutodeskEagle_RenamePlan.TEMP_NAME.format(idx)
+            idx += 1
+            steps.append((cycle[0], temp_name))
+            steps.extend((old_name, self.mapping[old_name]) for old_name in reversed(cycle[1:]))
+            steps.append((temp_name, self.mapping[cycle[0]]))
+        return steps
+
+    @staticmethod
+    def getFinalNames(steps):
+        # {old name: final name} after all steps, temporary names drop out
+        original_by_name = {}
+        for old_name, new_name in steps:
+            original_by_name[new_name] = original_by_name.pop(old_name, old_name)
+        return {old_name: new_name for new_name, old_name in original_by_name.items() if old_name != new_name}
+
+# parsed schematic or board, the index is built on first use
+class AutodeskEagle_SCH_Document:
+    def __init__(self, file_content):
+        if isinstance(file_content, MappedFile):
+            # the parser takes the mapped bytes chunk by chunk
+            parser = ET.XMLParser()
+            for chunk in file_content.chunks():
+                parser.feed(chunk)
+            self.xml = parser.close()
+        else:
+            self.xml = ET.fromstring(file_content)
+        self.__index = None
+
+    def getIndex(self):
+        if self.__index is None:
+            self.__index = AutodeskEagle_SCH_Index(self.xml)
+        return self.__index
+
 class AutodeskEagle_SCH_Loader:
+    VERSION = 2
+
+    @staticmethod
+    def parse(file_content):
+        if isinstance(file_content, AutodeskEagle_SCH_Document):
+            return file_content
+        return AutodeskEagle_SCH_Document(file_content)
+
     @staticmethod
     def getXML(file_content):
         if isinstance(file_content, str):
             return ET.fromstring(file_content)
+        if isinstance(file_content, AutodeskEagle_SCH_Document):
+            return file_content.xml
+        if isinstance(file_content, MappedFile):
+            return AutodeskEagle_SCH_Document(file_content).xml
         if isinstance(file_content, ET.Element):
             return file_content
         raise TypeError()
 
     @staticmethod
-    def getICList(file_content):
+    def getPart(node, pin_counts):
+        # (name, value, deviceset, pin count), the pin count comes from the
+        # connects of the device in the embedded library
+        attrib = node.attrib
+        device = (attrib.get("library"), attrib.get("deviceset"), attrib.get("device", ""))
+        return (attrib["name"], attrib.get("value", ""), attrib.get("deviceset", ""), pin_counts.get(device, 0))
+
+    # the libraries come first and make up most of a schematic, so the part
+    # list is taken from the raw bytes: only the <parts> sections are parsed
+    # and the pin counts come from a scan of the library tags
+    PARTS_RE = re.compile(rb"<parts(?:\s[^>]*)?(?:/>|>.*?</parts\s*>)", re.DOTALL)
+    PIN_COUNT_TAG_RE = re.compile(rb"<(library|deviceset|device|connect)\s([^>]*)>")
+    NAME_ATTR_RE = re.compile(rb"""\bname\s*=\s*(["'])(.*?)\1""", re.DOTALL)
+
+    @staticmethod
+    @contextmanager
+    def openBytes(file_content):
+        if isinstance(file_content, MappedFile):
+            with file_content.map() as buffer:
+                yield buffer
+        else:
+            yield file_content.encode(ENCODING)
+
+    @staticmethod
+    def getPinCounts(buffer):
+        # {(library, deviceset, device): number of connects}, a <connect>
+        # only appears in the <connects> of a device
+        pin_counts = {}
+        names = {b"library": None, b"deviceset": None}
+        device = None
+        for match in AutodeskEagle_SCH_Loader.PIN_COUNT_TAG_RE.finditer(buffer):
+            tag = match.group(1)
+            if tag == b"connect":
+                if device is not None:
+                    pin_counts[device] += 1
+                continue
+            name = AutodeskEagle_SCH_Loader.NAME_ATTR_RE.search(match.group(2))
+            name = "" if name is None else html.unescape(name.group(2).decode(ENCODING))
+            if tag == b"device":
+                device = (names[b"library"], names[b"deviceset"], name)
+                pin_counts.setdefault(device, 0)
+            else:
+                names[tag] = name
+                device = None
+        return pin_counts
+
+    @staticmethod
+    def getPartList(file_content, pin_counts=True):
+        # without pin counts every part has a pin count of 0
+        if isinstance(file_content, (str, MappedFile)):
+            parts = []
+            counts = {}
+            with AutodeskEagle_SCH_Loader.openBytes(file_content) as buffer:
+                # the parts of modules come before the top level ones
+                for match in AutodeskEagle_SCH_Loader.PARTS_RE.finditer(buffer):
+                    parts.extend(ET.fromstring(bytes(buffer[match.start():match.end()])).iter("part"))
+                if pin_counts:
+                    counts = AutodeskEagle_SCH_Loader.getPinCounts(buffer)
+            return [AutodeskEagle_SCH_Loader.getPart(node, counts) for node in parts]
         xml = AutodeskEagle_SCH_Loader.getXML(file_content)
-        result = []
-        for idx, value in enumerate(xml.findall(".//part")):
-            result.append(value.attrib["name"])
-        return result
+        counts = {}
+        if pin_counts:
+            for library in xml.iter("library"):
+                for deviceset in library.iter("deviceset"):
+                    for device in deviceset.iter("device"):
+                        connects = device.find("connects")
+                        counts[(library.attrib.get("name"), deviceset.attrib.get("name"), device.attrib.get("name", ""))] = 0 if connects is None else len(connects)
+        return [AutodeskEagle_SCH_Loader.getPart(node, counts) for node in xml.findall(".//part")]
+
+    @staticmethod
+    def getICList(file_content):
+        return [part[0] for part in AutodeskEagle_SCH_Loader.getPartList(file_content, False)]
+
+    @staticmethod
+    def getIndex(file_content):
+        if isinstance(file_content, AutodeskEagle_SCH_Index):
+            return file_content
+        if isinstance(file_content, AutodeskEagle_SCH_Document):
+            return file_content.getIndex()
+        return AutodeskEagle_SCH_Index(AutodeskEagle_SCH_Loader.getXML(file_content))
 
     @staticmethod
     def getModel(file_content, selected_ic):
-        xml = AutodeskEagle_SCH_Loader.getXML(file_content)
+        index = AutodeskEagle_SCH_Loader.getIndex(file_content)
         nnc = NamedNetContainer()
-        pa = PinAlias()
+        pa = PinAlias(index.getFamily(selected_ic))
 
-        query = ".//pinref[@part='{}']".format(selected_ic)
-        query_parent = query + "/../.."
-        for idx, parent in enumerate(xml.findall(query_parent)):
-            node = parent.find(query)
+        for pin, net in index.getPins(selected_ic):
             nnc.addEntry(
                 Name(
-                    node.attrib["pin"],
-                    pa.getIdForAlias(node.attrib["pin"])
+                    pin,
+                    pa.getIdForAlias(pin)
                 ),
                 Name(
-                    parent.attrib["name"],
-                    STM32CubeMX_Loader.labelToNetName(parent.attrib["name"])
+                    net,
+                    STM32CubeMX_Loader.labelToNetName(net)
                 )
             )
 
@@ -248,74 +577,198 @@ class AutodeskEagle_SCH_Loader:
     @staticmethod
     def getAllNetNames(file_content):
         xml = AutodeskEagle_SCH_Loader.getXML(file_content)
-        result = []
-        for idx, node in enumerate(xml.findall(".//net")):
-            name = node.attrib["name"]
-            if name not in result:
-                result.append(name)
-        return result
+        return list(dict.fromkeys(node.attrib["name"] for node in xml.iter("net")))
+
+    # the name attribute of a <signal> tag, the value doesn't contain the quote
+    SIGNAL_NAME_RE = re.compile(r"""(<signal\s(?:[^>]*?\s)?name\s*=\s*)(["'])(.*?)\2""", re.DOTALL)
 
     @staticmethod
-    def applyOperation(schematic, board, ic_name, targetContainer):
-        oc = OperationContext()
+    def splitTags(f, chunk_size=1024 * 1024):
+        # reads a file object in chunks, a piece ends before the last "<" so
+        # that no tag is split
+        pending = ""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            cut = pending.rfind("<")
+            if cut > 0:
+                yield pending[:cut]
+                pending = pending[cut:]
+        yield pending
 
-        schematic_xml = ET.fromstring(schematic)
-        board_xml = ET.fromstring(board)
+    @staticmethod
+    def renameSignals(board, rename_map, out=None, chunk_size=1024 * 1024, check_canceled=None):
+        # rewrites the board text without building a tree: only the names of
+        # renamed signals are replaced, everything else is copied unchanged;
+        # check_canceled is called per chunk
+        renamed = 0
+        def replace(match):
+            nonlocal renamed
+            new_name = rename_map.get(html.unescape(match.group(3)))
+            if new_name is None:
+                return match.group(0)
+            renamed += 1
+            quote = match.group(2)
+            return match.group(1) + quote + html.escape(new_name, quote=False).replace(quote, "&quot;" if quote == '"' else "&apos;") + quote
+
+        sub = AutodeskEagle_SCH_Loader.SIGNAL_NAME_RE.sub
+        if isinstance(board, str) and check_canceled is not None:
+            board = io.StringIO(board)
+        if isinstance(board, str):
+            result = sub(replace, board)
+            if out is not None:
+                out.write(result)
+                result = None
+            return result, renamed
+
+        write_buffer = io.StringIO() if out is None else out
+        for piece in AutodeskEagle_SCH_Loader.splitTags(board, chunk_size):
+            if check_canceled is not None:
+                check_canceled()
+            write_buffer.write(sub(replace, piece))
+
+        if out is not None:
+            return None, renamed
+        result = write_buffer.getvalue()
+        write_buffer.close()
+        return result, renamed
 
-        # add warnings for all ignored nets cause there pin's aren't connected        
-        openContainer_it = filter(lambda entry: entry.net is None and entry.new_net is not None, targetContainer)
-        for entry in openContainer_it:
-            oc.warnings.append("Can't assign pin {} to net {} cause it is not connected.".format(entry.name, entry.new_net))
+    @staticmethod
+    def renameNodes(xml, tag, steps, renamed=None, check_canceled=None):
+        # one walk collects the nodes per name, then the steps of the plan
+        # move them from name to name in order; every rename is added to
+        # renamed at once, so a canceled run can be undone
+        nodes_by_name = {}
+        for node in xml.iter(tag):
+            nodes_by_name.setdefault(node.attrib.get("name"), []).append(node)
+        renamed = [] if renamed is None else renamed
+        for old_name, new_name in steps:
+            if check_canceled is not None:
+                check_canceled()
+            nodes = nodes_by_name.pop(old_name, [])
+            for node in nodes:
+                node.set("name", new_name)
+                renamed.append((node, old_name))
+            nodes_by_name.setdefault(new_name, []).extend(nodes)
+        return renamed
 
-        goodContainer = TargetNetContainer.filterGood(targetContainer)
+    @staticmethod
+    def restoreNodes(renamed):
+        # backwards, a node of a cycle is renamed twice
+        for node, old_name in reversed(renamed):
+            node.set("name", old_name)
 
-        # step 1: find name conflits in net names
-        old_nets = [entry.net for entry in goodContainer]
-        all_nets = AutodeskEagle_SCH_Loader.getAllNetNames(schematic_xml)
-        unused_nets = filter(lambda name: name not in old_nets, all_nets)
+    @staticmethod
+    def applyOperation(schematic, board, ic_name, targetContainer, instrumentation=None, board_out=None):
+        return AutodeskEagle_SCH_Loader.applyOperations(schematic, board, [(ic_name, targetContainer)], instrumentation, board_out)
 
-        filteredContainer = TargetNetContainer()
-        for entry in goodContainer:
-            if entry.new_net in all_nets and entry.net in unused_nets:
-                # the target name is used from an unused net, so it is ignored
-                oc.errors.append("The net {} can't be renamed cause the new name {} is used somewhere else.".format(entry.net, entry.new_net))
-            else:
-                filteredContainer.append(entry)
-        
-        # step 2: decide temporary names for every net
-        tmp_name_schema = "tmp_net_name_{}"
-        i = 0
-        tmp_name_reg = {}
-        for entry in filteredContainer:
-            tmp_name = tmp_name_schema.format(i)
-            while tmp_name in all_nets:
-                i += 1
-                tmp_name = tmp_name_schema.format(i)
-            tmp_name_reg[str(entry.name)] = tmp_name
-            i += 1
-
-        # step 3: ...
-
-        # step 4: profit!!!
-
-        # step 5: rename all used nets to temp
-        for entry in filteredContainer:
-            for node in schematic_xml.findall(".//net[@name='{}']".format(entry.net.real_name)):
-                node.set("name", tmp_name_reg[str(entry.name)])
-            for node in board_xml.findall(".//signal[@name='{}']".format(entry.net.real_name)):
-                node.set("name", tmp_name_reg[str(entry.name)])
-
-        # step 6: rename all temp names to target names
-        for entry in filteredContainer:
-            for node in schematic_xml.findall(".//net[@name='{}']".format(tmp_name_reg[str(entry.name)])):
-                node.set("name", str(entry.new_net))
-            for node in board_xml.findall(".//signal[@name='{}']".format(tmp_name_reg[str(entry.name)])):
-                node.set("name", str(entry.new_net))
-            oc.log.append(entry)
-
-        oc.content = {
-            "sch": ET.tostring(schematic_xml, encoding="unicode"),
-            "brd": ET.tostring(board_xml, encoding="unicode")
-        }
+    @staticmethod
+    def applyOperations(schematic, board, targets, instrumentation=None, board_out=None):
+        # targets is a list of (ic_name, targetContainer), all of them are
+        # merged into one rename plan and applied in one pass per document
+        oc = OperationContext(instrumentation)
+        phase = oc.instrumentation.phase
+        several = len(targets) > 1
+
+        # raw board text and open board files are rewritten as a stream, only
+        # parsed boards go through the tree
+        stream_board = isinstance(board, (str, MappedFile)) or hasattr(board, "read")
+
+        with phase(Instrumentation.PARSE):
+            schematic_xml = AutodeskEagle_SCH_Loader.getXML(schematic)
+            board_xml = None if stream_board else AutodeskEagle_SCH_Loader.getXML(board)
+
+        with phase(Instrumentation.CONFLICTS):
+            goodContainers = []
+            for ic_name, targetContainer in targets:
+                # add warnings for all ignored nets cause there pin's aren't connected        
+                openContainer_it = filter(lambda entry: entry.net is None and entry.new_net is not None, targetContainer)
+                for entry in openContainer_it:
+                    pin = "{}:{}".format(ic_name, entry.name) if several else entry.name
+                    oc.warnings.append("Can't assign pin {} to net {} cause it is not connected.".format(pin, entry.new_net))
+
+                goodContainers.append((ic_name, TargetNetContainer.filterGood(targetContainer)))
+
+            # step 1: build one mapping for all renames, a net renamed by
+            # several pins or ICs must get the same new name everywhere
+            rename_map = {}
+            renamed_by = {}
+            nets = {}
+            planned = []
+            for ic_name, goodContainer in goodContainers:
+                for entry in goodContainer:
+                    old_name = entry.net.real_name
+                    new_name = str(entry.new_net)
+                    if old_name in rename_map and rename_map[old_name] != new_name:
+                        if several:
+                            oc.errors.append("The net {} can't be renamed to {} for {} cause {} renames it to {}.".format(
+                                entry.net, entry.new_net, ic_name, renamed_by[old_name], rename_map[old_name]))
+                        else:
+                            oc.errors.append("The net {} can't be renamed to {} cause it is already renamed to {}.".format(
+                                entry.net, entry.new_net, rename_map[old_name]))
+                        continue
+                    rename_map[old_name] = new_name
+                    renamed_by.setdefault(old_name, ic_name)
+                    nets[old_name] = entry.net
+                    planned.append((ic_name, entry))
+
+            # step 2: check all new names against the nets of both documents
+            # before anything is rewritten
+            net_table = AutodeskEagle_NetTable()
+            net_table.addSchematic(schematic_xml)
+            if not net_table.addBoard(board if stream_board else board_xml):
+                oc.warnings.append("The board can't be checked for name conflicts.")
+            rejected = net_table.findConflicts(rename_map)
+            for old_name, (new_name, other_name) in rejected.items():
+                del rename_map[old_name]
+                if other_name is None:
+                    oc.errors.append("The net {} can't be renamed cause the new name {} is used somewhere else.".format(nets[old_name], new_name))
+                else:
+                    oc.errors.append("The net {} can't be renamed to {} cause the net {} gets the same name.".format(nets[old_name], new_name, nets[other_name]))
+            plan = AutodeskEagle_RenamePlan(rename_map)
+
+            for ic_name, entry in planned:
+                if entry.net.real_name not in rename_map:
+                    continue
+                if several:
+                    oc.log.append(RenamedNetEntry(Name("{}:{}".format(ic_name, entry.name.real_name), "{}:{}".format(ic_name, entry.name)), entry.net, entry.new_net))
+                else:
+                    oc.log.append(entry)
+
+        # the parsed documents may be shared with later runs, so the renames
+        # are undone even if writing the board fails
+        renamed = []
+        try:
+            with phase(Instrumentation.RENAME):
+                # step 3: execute the plan, temporary names are checked against
+                # the nets of both documents
+                steps = plan.getSteps(taken=net_table)
+                check_canceled = oc.instrumentation.checkCanceled
+                AutodeskEagle_SCH_Loader.renameNodes(schematic_xml, "net", steps, renamed, check_canceled)
+                if stream_board:
+                    # a stream is rewritten in one pass, so the steps are applied as
+                    # the final name of every renamed signal
+                    board_map = AutodeskEagle_RenamePlan.getFinalNames(steps)
+                    if isinstance(board, MappedFile):
+                        with board.openText() as f:
+                            board_content, _ = AutodeskEagle_SCH_Loader.renameSignals(f, board_map, board_out, check_canceled=check_canceled)
+                    else:
+                        board_content, _ = AutodeskEagle_SCH_Loader.renameSignals(board, board_map, board_out, check_canceled=check_canceled)
+                else:
+                    AutodeskEagle_SCH_Loader.renameNodes(board_xml, "signal", steps, renamed, check_canceled)
+
+            with phase(Instrumentation.SERIALIZE):
+                if not stream_board:
+                    board_content = ET.tostring(board_xml, encoding="unicode")
+                oc.content = {
+                    "sch": ET.tostring(schematic_xml, encoding="unicode"),
+                    "brd": board_content
+                }
+        finally:
+            # the restore has to run even after a cancel
+            with phase(Instrumentation.RENAME, cancelable=False):
+                AutodeskEagle_SCH_Loader.restoreNodes(renamed)
         oc.successfull = True
-        return oc
\ No newline at end of file
+        return oc
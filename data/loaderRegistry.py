@@ -0,0 +1,37 @@
+import importlib
+from collections.abc import Mapping
+
+class FileFormatUnknown(Exception):
+    pass
+
+# maps file extensions to loaders; a loader module is imported on the first
+# lookup of one of its extensions, not at startup
+class LoaderRegistry(Mapping):
+    def __init__(self, loaders):
+        self.__loaders = loaders
+        self.__resolved = {}
+
+    def __getitem__(self, ext):
+        if ext not in self.__resolved:
+            loader = None
+            if self.__loaders[ext] is not None:
+                module, name = self.__loaders[ext]
+                loader = getattr(importlib.import_module(module, __package__), name)
+            self.__resolved[ext] = loader
+        return self.__resolved[ext]
+
+    def __contains__(self, ext):
+        return ext in self.__loaders
+
+    def __iter__(self):
+        return iter(self.__loaders)
+
+    def __len__(self):
+        return len(self.__loaders)
+
+KNOWN_FILE_EXT_LOADER = LoaderRegistry({
+    ".ioc": (".loader", "STM32CubeMX_Loader"),
+    ".csv": (".loader", "STM32CubeMX_CSV_Loader"),
+    ".sch": (".loader", "AutodeskEagle_SCH_Loader"),
+    ".brd": None
+})
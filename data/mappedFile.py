@@ -0,0 +1,80 @@
+import io
+import mmap
+import os
+from contextlib import contextmanager
+
+# every source is read and every target written with this encoding, Eagle
+# files declare it and the parser reads the schematic bytes with it
+ENCODING = "utf-8"
+
+class MappedReader(io.RawIOBase):
+    def __init__(self, buffer):
+        self.__buffer = buffer
+        self.__pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        size = min(len(b), len(self.__buffer) - self.__pos)
+        b[:size] = self.__buffer[self.__pos:self.__pos + size]
+        self.__pos += size
+        return size
+
+# a file that is only mapped into memory while it is read, so the bytes are
+# taken from the page cache instead of being copied into Python strings; the
+# map is released after every use because an open map locks the file on
+# Windows and the targets usually overwrite their sources
+class MappedFile:
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path, encoding=ENCODING):
+        self.path = path
+        self.encoding = encoding
+        self.__size = os.path.getsize(path)
+
+    def __len__(self):
+        return self.__size
+
+    @contextmanager
+    def map(self):
+        if self.__size == 0:
+            yield memoryview(b"")
+            return
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapped)
+        try:
+            yield buffer
+        finally:
+            buffer.release()
+            mapped.close()
+
+    @contextmanager
+    def openBinary(self):
+        with self.map() as buffer:
+            reader = io.BufferedReader(MappedReader(buffer), MappedFile.CHUNK_SIZE)
+            try:
+                yield reader
+            finally:
+                # the reader holds slices of the buffer, it has to go first
+                reader.close()
+
+    @contextmanager
+    def openText(self):
+        # same newline handling as open(path) in text mode
+        with self.openBinary() as reader:
+            text = io.TextIOWrapper(reader, encoding=self.encoding)
+            try:
+                yield text
+            finally:
+                text.detach()
+
+    def chunks(self):
+        with self.map() as buffer:
+            for idx in range(0, len(buffer), MappedFile.CHUNK_SIZE):
+                yield bytes(buffer[idx:idx + MappedFile.CHUNK_SIZE])
+
+    def read(self):
+        with self.openText() as f:
+            return f.read()
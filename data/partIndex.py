@@ -0,0 +1,78 @@
+import re
+
+# device names of common microcontroller families, used to show the MCUs of a
+# schematic first
+MCU_RE = re.compile(r"^(STM32|STM8|ATMEGA|ATTINY|ATSAM|ATXMEGA|PIC\d|DSPIC|NRF5|ESP32|ESP8266|LPC\d|MK\d|MSP430|RP2040|GD32|EFM32|CC\d\d)|MCU|MICROCONTROLLER", re.IGNORECASE)
+
+# searches the parts of a schematic as (name, value, deviceset, pin count);
+# every query matches against a lower case key per part, prefix matches of
+# any field come first, and a trigram index narrows down the candidates so
+# typing stays interactive for large schematics
+class PartIndex:
+    def __init__(self, parts, rank_mcu=False):
+        self.parts = parts
+        self.__order = sorted(range(len(parts)), key=lambda idx: PartIndex.getSortKey(parts[idx], rank_mcu))
+        self.__position = [0] * len(parts)
+        for position, idx in enumerate(self.__order):
+            self.__position[idx] = position
+
+        # "\0" separates the fields, so a prefix of any field is found as "\0" + query
+        self.__keys = ["\0" + "\0".join((name, value, deviceset)).lower() for name, value, deviceset, _ in parts]
+        self.__trigrams = {}
+        for idx, key in enumerate(self.__keys):
+            for pos in range(len(key) - 2):
+                self.__trigrams.setdefault(key[pos:pos + 3], set()).add(idx)
+
+        self.__last_query = ""
+        self.__last_result = self.__order
+
+    @staticmethod
+    def isLikelyMCU(part):
+        name, value, deviceset, _ = part
+        return MCU_RE.search(deviceset) is not None or MCU_RE.search(value) is not None
+
+    @staticmethod
+    def getSortKey(part, rank_mcu):
+        # natural order, R2 before R10
+        name_key = [int(token) if token.isdigit() else token for token in re.split(r"(\d+)", part[0].upper())]
+        if rank_mcu:
+            return (not PartIndex.isLikelyMCU(part), -part[3], name_key)
+        return (name_key,)
+
+    def getCandidates(self, query):
+        if self.__last_query != "" and self.__last_query in query:
+            # typing on narrows the last result
+            return self.__last_result
+        if len(query) < 3 or "\0" in query:
+            return self.__order
+        postings = []
+        for pos in range(len(query) - 2):
+            posting = self.__trigrams.get(query[pos:pos + 3])
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set.intersection(*postings)
+        return sorted(candidates, key=self.__position.__getitem__)
+
+    def search(self, query):
+        query = query.lower()
+        if query == "":
+            result = self.__order
+        else:
+            prefix = "\0" + query
+            prefix_matches = []
+            matches = []
+            for idx in self.getCandidates(query):
+                key = self.__keys[idx]
+                if prefix in key:
+                    prefix_matches.append(idx)
+                elif query in key:
+                    matches.append(idx)
+            # a narrowed result has the former prefix matches in front, so the
+            # rest has to be put back into display order
+            matches.sort(key=self.__position.__getitem__)
+            result = prefix_matches + matches
+        self.__last_query = query
+        self.__last_result = result
+        return result
@@ -0,0 +1,180 @@
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import threading
+from .mappedFile import ENCODING
+
+if getattr(sys, "frozen", False):
+    SETTINGS_DIR = os.path.join(os.path.dirname(sys.executable), "settings")
+else:
+    SETTINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "settings")
+
+# the aliases for all families and one source per family, compiled into DATABASE
+COMMON_SOURCE = os.path.join(SETTINGS_DIR, "alternative_pin_names.csv")
+FAMILY_SOURCES = os.path.join(SETTINGS_DIR, "pin_aliases")
+DATABASE = os.path.join(SETTINGS_DIR, "pin_aliases.db")
+COMMON = "common"
+
+# a port pin with an optional "_C" dual pad, followed by an alternate
+# function ("PA0/WKUP", "PC14-OSC32_IN", "PH0-OSC_IN (PH0)") or a pad
+# number ("PA0@2")
+PIN_RE = re.compile(r"(P[A-Z]\d{1,2})(_C)?(?=$|[-/ (_@])")
+FAMILY_RE = re.compile(r"STM32(?:MP\d|W[A-Z]|[A-Z]\d)")
+
+def getCanonicalName(name):
+    match = PIN_RE.match(name.strip().upper())
+    if match is None:
+        return name
+    return match.group(1) + (match.group(2) or "")
+
+def getFamily(device):
+    # "STM32F405RGTx" and "STM32F4" both give "STM32F4"
+    if device is None:
+        return None
+    match = FAMILY_RE.match(device.strip().upper())
+    return None if match is None else match.group(0)
+
+def readSource(path):
+    aliases_by_id = {}
+    with open(path, newline="", encoding=ENCODING) as f:
+        for line in csv.reader(f, delimiter=",", quotechar='"'):
+            if len(line) > 0:
+                aliases_by_id.setdefault(line[0], []).extend(line[1:])
+    return aliases_by_id
+
+def readSources():
+    tables = {COMMON: readSource(COMMON_SOURCE)}
+    if os.path.isdir(FAMILY_SOURCES):
+        for filename in sorted(os.listdir(FAMILY_SOURCES)):
+            family, ext = os.path.splitext(filename)
+            if ext == ".csv":
+                tables[family] = readSource(os.path.join(FAMILY_SOURCES, filename))
+    return tables
+
+def getSourcePaths():
+    # a frozen build ships the compiled database only
+    paths = [COMMON_SOURCE] if os.path.exists(COMMON_SOURCE) else []
+    if os.path.isdir(FAMILY_SOURCES):
+        # the directory changes when a family is added or removed
+        paths.append(FAMILY_SOURCES)
+        paths += [os.path.join(FAMILY_SOURCES, filename) for filename in os.listdir(FAMILY_SOURCES) if filename.endswith(".csv")]
+    return paths
+
+def compileDatabase(target=DATABASE):
+    # one JSON line with the offset and length of every family, followed by
+    # one compact JSON table per family, so a family is read with one seek
+    blobs = [(family, json.dumps(table, separators=(",", ":"), sort_keys=True).encode("utf-8")) for family, table in readSources().items()]
+    index = {}
+    offset = 0
+    for family, blob in blobs:
+        index[family] = [offset, len(blob)]
+        offset += len(blob)
+    with open(target, "wb") as f:
+        f.write(json.dumps(index, sort_keys=True).encode("utf-8") + b"\n")
+        for _, blob in blobs:
+            f.write(blob)
+    return index
+
+class AliasTable:
+    def __init__(self, aliases_by_id):
+        self.aliases_by_id = aliases_by_id
+        self.ids_by_alias = {}
+        for id_, aliases in aliases_by_id.items():
+            for alias in aliases:
+                self.ids_by_alias[getCanonicalName(alias).upper()] = id_
+
+# reads the family tables on first use; without an up to date compiled
+# database the sources are read instead
+class PinAliasDatabase:
+    def __init__(self, path=DATABASE):
+        self.path = path
+        self.__index = None
+        self.__sources = None
+        self.__tables = {}
+        self.__lock = threading.Lock()
+
+    def isCompiled(self):
+        if not os.path.exists(self.path):
+            return False
+        compiled = os.path.getmtime(self.path)
+        return all(os.path.getmtime(path) <= compiled for path in getSourcePaths())
+
+    def open(self):
+        if self.__index is not None or self.__sources is not None:
+            return
+        if self.isCompiled():
+            with open(self.path, "rb") as f:
+                self.__index = json.loads(f.readline())
+        else:
+            self.__sources = readSources()
+
+    def readTable(self, family):
+        if self.__sources is not None:
+            return self.__sources.get(family)
+        if family not in self.__index:
+            return None
+        offset, length = self.__index[family]
+        with open(self.path, "rb") as f:
+            f.readline()
+            f.seek(offset, os.SEEK_CUR)
+            return json.loads(f.read(length))
+
+    def getTable(self, family):
+        with self.__lock:
+            if family not in self.__tables:
+                self.open()
+                aliases_by_id = self.readTable(family)
+                self.__tables[family] = None if aliases_by_id is None else AliasTable(aliases_by_id)
+            return self.__tables[family]
+
+    def getDataHash(self):
+        digest = hashlib.sha256()
+        if self.isCompiled():
+            with open(self.path, "rb") as f:
+                digest.update(f.read())
+        else:
+            digest.update(json.dumps(readSources(), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+class PinAlias:
+    database = None
+    data_hash = None
+
+    def __init__(self, family=None):
+        if PinAlias.database is None:
+            PinAlias.database = PinAliasDatabase()
+        family = getFamily(family)
+        tables = [PinAlias.database.getTable(family)] if family is not None else []
+        self.__tables = [table for table in tables + [PinAlias.database.getTable(COMMON)] if table is not None]
+        self.__ids = {}
+
+    @staticmethod
+    def getDataHash():
+        # the STM32CubeMX models depend on the aliases, so cached models are
+        # keyed by them too
+        if PinAlias.data_hash is None:
+            if PinAlias.database is None:
+                PinAlias.database = PinAliasDatabase()
+            PinAlias.data_hash = PinAlias.database.getDataHash()
+        return PinAlias.data_hash
+
+    def getIdForAlias(self, alias):
+        id_ = self.__ids.get(alias)
+        if id_ is None:
+            canonical = getCanonicalName(alias)
+            id_ = canonical
+            for table in self.__tables:
+                if canonical.upper() in table.ids_by_alias:
+                    id_ = table.ids_by_alias[canonical.upper()]
+                    break
+            self.__ids[alias] = id_
+        return id_
+
+    def getAliasesForId(self, id_):
+        aliases = []
+        for table in self.__tables:
+            aliases.extend(table.aliases_by_id.get(id_, ()))
+        return aliases
@@ -0,0 +1,16 @@
+from PySide2.QtWidgets import QWizardPage
+
+class BusyWizardPage(QWizardPage):
+    def __init__(self, *argc, **argv):
+        super().__init__(*argc, **argv)
+        self.__busy = False
+
+    def isBusy(self):
+        return self.__busy
+
+    def setBusy(self, busy):
+        self.__busy = busy
+        self.completeChanged.emit()
+
+    def isComplete(self):
+        return not self.__busy and super().isComplete()
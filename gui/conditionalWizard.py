@@ -0,0 +1,27 @@
+from PySide2.QtWidgets import QWizard
+from PySide2.QtCore import Slot
+
+class ConditionalWizard(QWizard):
+    def __init__(self, *argc, **argv):
+        super().__init__(*argc, **argv)
+        self.currentIdChanged.connect(self.onPageChanged)
+        self.__last_idx = 0
+        self.__callback = None
+
+    @Slot()
+    def onPageChanged(self, page_idx):
+        if self.__callback is not None:
+            if self.__last_idx < page_idx:  # changed to the next page
+                if self.__callback(self.__last_idx) is False:
+                    self.back()
+                    return
+        self.__last_idx = page_idx
+            
+    def accept(self):
+        if self.__callback is not None:
+            if self.__callback(-1) is False:
+                return
+        super().accept()
+
+    def registerCallback(self, callback):
+        self.__callback = callback
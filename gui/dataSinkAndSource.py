@@ -2,16 +2,14 @@ from PySide2.QtWidgets import QFileDialog, QMessageBox
 from PySide2.QtCore import QFile, Slot, QSize
 
 import os
+import shutil
+import tempfile
 
 from .selectIC import openSelectICDialog
 
-from data.loader import *
-KNOWN_FILE_EXT_LOADER = {
-    ".ioc": STM32CubeMX_Loader,
-    ".csv": STM32CubeMX_CSV_Loader,
-    ".sch": AutodeskEagle_SCH_Loader,
-    ".brd": None
-}
+from data.loaderRegistry import KNOWN_FILE_EXT_LOADER, FileFormatUnknown
+from data.cache import FILE_CACHE
+from data.mappedFile import ENCODING
 
 class ValidationFailed(Exception):
     @staticmethod
@@ -37,6 +35,9 @@ class LineEditWithButton:
         self.__line_edit.setText(value)
         return self
 
+    def connectChanged(self, handler):
+        self.__line_edit.textChanged.connect(lambda _: handler())
+
 def generateOFD(master, title, filter):
     def f(manager):
         path, _ = QFileDialog.getOpenFileName(master, title, manager.getValue(), filter)
@@ -60,7 +61,7 @@ class DataManager:
     def validate(self):
         raise NotImplementedError()
 
-    def load(self):
+    def load(self, instrumentation=None):
         raise NotImplementedError()
 
     def isLoaded(self):
@@ -73,7 +74,7 @@ class DataManager:
         raise NotImplementedError()
 
 class DataSource(DataManager):
-    def getModel(self):
+    def getModel(self, instrumentation=None):
         raise NotImplementedError()
 
 class DataSink(DataManager):
@@ -104,12 +105,17 @@ class STM32CubeMX_DataSource(DataSource):
                 "STM32CubeMX (*.ioc *.csv)"
             )
         )
+        # another file has to be loaded again
+        self.__source.connectChanged(self.unload)
         self.__loaded = False
         self.__window = window
 
     def validate(self):
         ValidationFailed.fileExistsValidation(self.__source.getValue())
         
+    def unload(self):
+        self.__loaded = False
+
     def isLoaded(self):
         return self.__loaded
 
@@ -117,7 +123,7 @@ class STM32CubeMX_DataSource(DataSource):
         self.__loaded = False
         self.__source.setValue("")
 
-    def load(self):
+    def load(self, instrumentation=None):
         try:
             self.validate()
         except ValidationFailed:
@@ -125,28 +131,24 @@ class STM32CubeMX_DataSource(DataSource):
             QMessageBox.critical(self.__window, "File not found", "STM32CubeMX file \"{}\" can't be found.".format(self.__source.getValue()))
             return
 
-        if self.isLoaded():
+        # asked on every load, an edited file gets a new cache entry
+        path = self.__source.getValue()
+        _, self.__file_ext = os.path.splitext(path)
+        if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
+            QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
+            self.__loaded = False
             return
+        self.__file = FILE_CACHE.get(path, instrumentation)
+        self.__loaded = True
 
-        path = self.__source.getValue()
-        with open(path) as f:
-            self.__file_content = f.read()
-            _, self.__file_ext = os.path.splitext(self.__source.getValue())
-            if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
-                QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
-                self.__loaded = False
-                return
-            self.__loaded = True
-
-    def getModel(self):
+    def getModel(self, instrumentation=None):
         if not self.isLoaded():
             return
 
         try:
-            return KNOWN_FILE_EXT_LOADER[self.__file_ext].getModel(self.__file_content)
+            return self.__file.getModel(KNOWN_FILE_EXT_LOADER[self.__file_ext], instrumentation=instrumentation)
         except FileFormatUnknown:
-            QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid STM32CubeMX file.".format(self.__source.getValue()))
-            return
+            raise FileFormatUnknown("The file \"{}\" seams not to be a valid STM32CubeMX file.".format(self.__file.path))
 
     def getInput(self):
         return self.__source.getValue()
@@ -162,12 +164,17 @@ class STM32CubeMX_DataSink(DataSink):
                 "STM32CubeMX (*.ioc *.csv)"
             )
         )
+        # another file has to be loaded again
+        self.__source.connectChanged(self.unload)
         self.__loaded = False
         self.__window = window
 
     def validate(self):
         ValidationFailed.fileExistsValidation(self.__source.getValue())
         
+    def unload(self):
+        self.__loaded = False
+
     def isLoaded(self):
         return self.__loaded
 
@@ -175,7 +182,7 @@ class STM32CubeMX_DataSink(DataSink):
         self.__loaded = False
         self.__source.setValue("")
 
-    def load(self):
+    def load(self, instrumentation=None):
         try:
             self.validate()
         except ValidationFailed:
@@ -183,37 +190,34 @@ class STM32CubeMX_DataSink(DataSink):
             QMessageBox.critical(self.__window, "File not found", "STM32CubeMX file \"{}\" can't be found.".format(self.__source.getValue()))
             return
 
-        if self.isLoaded():
+        # asked on every load, an edited file gets a new cache entry
+        path = self.__source.getValue()
+        _, self.__file_ext = os.path.splitext(path)
+        if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
+            QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
+            self.__loaded = False
             return
+        self.__file = FILE_CACHE.get(path, instrumentation)
+        self.__loaded = True
 
-        path = self.__source.getValue()
-        with open(path) as f:
-            self.__file_content = f.read()
-            _, self.__file_ext = os.path.splitext(self.__source.getValue())
-            if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
-                QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
-                self.__loaded = False
-                return
-            self.__loaded = True
-
-    def getModel(self):
+    def getModel(self, instrumentation=None):
         if not self.isLoaded():
             return
 
         try:
-            return KNOWN_FILE_EXT_LOADER[self.__file_ext].getModel(self.__file_content)
+            return self.__file.getModel(KNOWN_FILE_EXT_LOADER[self.__file_ext], instrumentation=instrumentation)
         except FileFormatUnknown:
-            QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid STM32CubeMX file.".format(self.__source.getValue()))
-            return
+            raise FileFormatUnknown("The file \"{}\" seams not to be a valid STM32CubeMX file.".format(self.__file.path))
 
     def getInput(self):
         return self.__source.getValue()
 
-    def apply(self, target_net_container):
+    def apply(self, target_net_container, instrumentation=None):
         if not self.isLoaded():
             return
 
-        return KNOWN_FILE_EXT_LOADER[self.__file_ext].applyOperation(self.__file_content, target_net_container)
+        loader = KNOWN_FILE_EXT_LOADER[self.__file_ext]
+        return loader.applyOperation(self.__file.getDocument(loader, instrumentation), target_net_container, instrumentation=instrumentation)
 
 class AutodeskEagle_DataSource(DataSource):
     def __init__(self, window, schematic, ic):
@@ -231,16 +235,18 @@ class AutodeskEagle_DataSource(DataSource):
             ic[1], 
             self.openSelectICDialog
         )
+        # another file has to be loaded again
+        self.__schematic.connectChanged(self.unload)
         self.__loaded = False
         self.__window = window
 
     def validate(self):
         ValidationFailed.fileExistsValidation(self.__schematic.getValue())
 
-    def load(self):
-        if self.isLoaded():
-            return
-        
+    def load(self, instrumentation=None):
+        # the IC name is kept for the worker thread, which mustn't touch the widgets
+        self.__ic_name = self.__ic.getValue()
+
         try:
             self.validate()
         except ValidationFailed:
@@ -248,15 +254,18 @@ class AutodeskEagle_DataSource(DataSource):
             QMessageBox.critical(self.__window, "File not found", "Autodesk Eagle schematic \"{}\" can't be found.".format(self.__schematic.getValue()))
             return
 
+        # asked on every load, an edited file gets a new cache entry
         path = self.__schematic.getValue()
-        with open(path) as f:
-            self.__file_content = f.read()
-            _, self.__file_ext = os.path.splitext(self.__schematic.getValue())
-            if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
-                QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
-                self.__loaded = False
-                return
-            self.__loaded = True
+        _, self.__file_ext = os.path.splitext(path)
+        if self.__file_ext not in KNOWN_FILE_EXT_LOADER:
+            QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__file_ext))
+            self.__loaded = False
+            return
+        self.__file = FILE_CACHE.get(path, instrumentation)
+        self.__loaded = True
+
+    def unload(self):
+        self.__loaded = False
 
     def isLoaded(self):
         return self.__loaded
@@ -267,13 +276,15 @@ class AutodeskEagle_DataSource(DataSource):
         if not self.isLoaded():
             return
 
+        file = self.__file
+        loader = KNOWN_FILE_EXT_LOADER[self.__file_ext]
         try: 
-            ic_list = KNOWN_FILE_EXT_LOADER[self.__file_ext].getICList(self.__file_content)
+            file.getPartList(loader, False)
         except FileFormatUnknown:
             QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__schematic.getValue()))
             return
 
-        accepted, ic = openSelectICDialog(ic_list)
+        accepted, ic = openSelectICDialog(lambda pin_counts: file.getPartList(loader, pin_counts))
         if accepted:
             self.__ic.setValue(ic)
 
@@ -282,15 +293,14 @@ class AutodeskEagle_DataSource(DataSource):
         self.__schematic.setValue("")
         self.__ic.setValue("")
 
-    def getModel(self):
+    def getModel(self, instrumentation=None):
         if not self.isLoaded():
             return
 
         try:
-            return KNOWN_FILE_EXT_LOADER[self.__file_ext].getModel(self.__file_content, self.__ic.getValue())
+            return self.__file.getModel(KNOWN_FILE_EXT_LOADER[self.__file_ext], self.__ic_name, instrumentation=instrumentation)
         except FileFormatUnknown:
-            QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__schematic.getValue()))
-            return
+            raise FileFormatUnknown("The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__file.path))
 
     def getInput(self):
         return self.__schematic.getValue(), self.__ic.getValue()
@@ -320,6 +330,9 @@ class AutodeskEagle_DataSink(DataSink):
             ic[1], 
             self.openSelectICDialog
         )
+        # another file has to be loaded again
+        self.__schematic.connectChanged(self.unload)
+        self.__board.connectChanged(self.unload)
         self.__loaded = False
         self.__window = window
 
@@ -327,9 +340,9 @@ class AutodeskEagle_DataSink(DataSink):
         ValidationFailed.fileExistsValidation(self.__schematic.getValue())
         ValidationFailed.fileExistsValidation(self.__board.getValue())
 
-    def load(self):
-        if self.isLoaded():
-            return
+    def load(self, instrumentation=None):
+        # the IC name is kept for the worker thread, which mustn't touch the widgets
+        self.__ic_name = self.__ic.getValue()
 
         try:
             self.validate()
@@ -338,26 +351,28 @@ class AutodeskEagle_DataSink(DataSink):
             QMessageBox.critical(self.__window, "File not found", "One of the selected files can't be found.")
             return
 
+        # asked on every load, an edited file gets a new cache entry
         path = self.__schematic.getValue()
-        with open(path) as f:
-            self.__schematic_content = f.read()
-            _, self.__schematic_ext = os.path.splitext(self.__schematic.getValue())
-            if self.__schematic_ext not in KNOWN_FILE_EXT_LOADER:
-                QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__schematic_ext))
-                self.__loaded = False
-                return
+        _, self.__schematic_ext = os.path.splitext(path)
+        if self.__schematic_ext not in KNOWN_FILE_EXT_LOADER:
+            QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__schematic_ext))
+            self.__loaded = False
+            return
+        self.__schematic_file = FILE_CACHE.get(path, instrumentation)
 
         path = self.__board.getValue()
-        with open(path) as f:
-            self.__board_content = f.read()
-            _, self.__board_ext = os.path.splitext(self.__board.getValue())
-            if self.__board_ext not in KNOWN_FILE_EXT_LOADER:
-                QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__board_ext))
-                self.__loaded = False
-                return
+        _, self.__board_ext = os.path.splitext(path)
+        if self.__board_ext not in KNOWN_FILE_EXT_LOADER:
+            QMessageBox.critical(self.__window, "File extension unknown", "Can't handle files with extension \"{}\".".format(self.__board_ext))
+            self.__loaded = False
+            return
+        self.__board_file = FILE_CACHE.get(path, instrumentation)
         
         self.__loaded = True
 
+    def unload(self):
+        self.__loaded = False
+
     def isLoaded(self):
         return self.__loaded
 
@@ -367,13 +382,15 @@ class AutodeskEagle_DataSink(DataSink):
         if not self.isLoaded():
             return
 
+        file = self.__schematic_file
+        loader = KNOWN_FILE_EXT_LOADER[self.__schematic_ext]
         try: 
-            ic_list = KNOWN_FILE_EXT_LOADER[self.__schematic_ext].getICList(self.__schematic_content)
+            file.getPartList(loader, False)
         except FileFormatUnknown:
             QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__schematic.getValue()))
             return
 
-        accepted, ic = openSelectICDialog(ic_list)
+        accepted, ic = openSelectICDialog(lambda pin_counts: file.getPartList(loader, pin_counts))
         if accepted:
             self.__ic.setValue(ic)
 
@@ -386,21 +403,30 @@ class AutodeskEagle_DataSink(DataSink):
         self.__board.setValue("")
         self.__ic.setValue("")
 
-    def getModel(self):
+    def getModel(self, instrumentation=None):
         if not self.isLoaded():
             return
 
         try:
-            return KNOWN_FILE_EXT_LOADER[self.__schematic_ext].getModel(self.__schematic_content, self.__ic.getValue())
+            return self.__schematic_file.getModel(KNOWN_FILE_EXT_LOADER[self.__schematic_ext], self.__ic_name, instrumentation=instrumentation)
         except FileFormatUnknown:
-            QMessageBox.critical(self.__window, "File format unknown", "The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__schematic.getValue()))
-            return
+            raise FileFormatUnknown("The file \"{}\" seams not to be a valid Autodesk Eagle schematic.".format(self.__schematic_file.path))
 
-    def apply(self, target_net_container):
+    def apply(self, target_net_container, instrumentation=None):
         if not self.isLoaded():
             return
 
-        return KNOWN_FILE_EXT_LOADER[self.__schematic_ext].applyOperation(self.__schematic_content, self.__board_content, self.__ic.getValue(), target_net_container)
+        loader = KNOWN_FILE_EXT_LOADER[self.__schematic_ext]
+        # the target is chosen later, so the board is streamed into a
+        # temporary file that is copied on write
+        board_out = tempfile.TemporaryFile("w+", encoding=ENCODING, newline="")
+        try:
+            operation_result = loader.applyOperation(self.__schematic_file.getDocument(loader, instrumentation), self.__board_file.content, self.__ic_name, target_net_container, instrumentation=instrumentation, board_out=board_out)
+        except BaseException:
+            board_out.close()
+            raise
+        operation_result.content["brd"] = board_out
+        return operation_result
 
     def getInput(self):
         return self.__schematic.getValue(), self.__board.getValue(), self.__ic.getValue()
@@ -425,7 +451,7 @@ class STM32CubeMX_DataTarget(DataTarget):
         self.__target.setValue(other.getInput())
 
     def write(self, operation_result):
-        with open(self.__target.getValue(), "w") as f:
+        with open(self.__target.getValue(), "w", encoding=ENCODING) as f:
             f.write(operation_result.content)
 
 class AutodeskEagle_DataTarget(DataTarget):
@@ -460,7 +486,9 @@ class AutodeskEagle_DataTarget(DataTarget):
         self.__board.setValue(b)
 
     def write(self, operation_result):
-        with open(self.__schematic.getValue(), "w") as f:
+        with open(self.__schematic.getValue(), "w", encoding=ENCODING) as f:
             f.write(operation_result.content["sch"])
-        with open(self.__board.getValue(), "w") as f:
-            f.write(operation_result.content["brd"])
\ No newline at end of file
+        with open(self.__board.getValue(), "w", encoding=ENCODING) as f:
+            board = operation_result.content["brd"]
+            board.seek(0)
+            shutil.copyfileobj(board, f)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import os
+import sys
+import importlib
+import importlib.util
+
+from PySide2.QtCore import QFile
+
+# the .ui files are looked up beside the sources or the frozen executable,
+# independent of the working directory
+if getattr(sys, "frozen", False):
+    UI_DIR = os.path.join(os.path.dirname(sys.executable), "ui")
+else:
+    UI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ui")
+
+def loadForm(name, form_class, widget_class, custom_widgets=()):
+    # the form classes generated by "make forms" are used if they exist, so
+    # no XML has to be parsed at runtime; the .ui file is the fallback
+    module_name = "{}.ui_{}".format(__package__, name)
+    if importlib.util.find_spec(module_name) is not None:
+        widget = widget_class()
+        form = getattr(importlib.import_module(module_name), form_class)()
+        form.setupUi(widget)
+        return widget
+
+    from PySide2.QtUiTools import QUiLoader
+    ui_file_loader = QUiLoader()
+    for custom_widget in custom_widgets:
+        ui_file_loader.registerCustomWidget(custom_widget)
+    ui_file = QFile(os.path.join(UI_DIR, name + ".ui"))
+    ui_file.open(QFile.ReadOnly)
+    widget = ui_file_loader.load(ui_file)
+    ui_file.close()
+    return widget
@@ -1,39 +1,23 @@
-from PySide2.QtUiTools import QUiLoader
-from PySide2.QtWidgets import QApplication, QWizard, QWizardPage, QPushButton, QLineEdit, QFileDialog, QMessageBox, QTreeView, QPlainTextEdit, QWidget, QLabel, QComboBox, QTableView
+from PySide2.QtWidgets import QApplication, QWizard, QWizardPage, QPushButton, QLineEdit, QFileDialog, QMessageBox, QTreeView, QPlainTextEdit, QWidget, QLabel, QComboBox, QTableView, QProgressBar, QHeaderView
 from PySide2.QtGui import QStandardItemModel, QStandardItem
-from PySide2.QtCore import QFile, Slot, QSize
+from PySide2.QtCore import Slot, QSize, QThreadPool, QTimer
 from .resizeStackWidget import ResizeStackWidget
-
-from data.dataModel import NamedNetContainer, TargetNetContainer
+from .busyWizardPage import BusyWizardPage
+from .conditionalWizard import ConditionalWizard
+from .forms import loadForm
+from .operationWorker import OperationWorker
+from .resultModels import ChangelogModel, MessageModel, createFilterProxy
+
+from data.dataModel import NamedNetContainer, TargetNetContainer, Instrumentation
+from data.cache import FILE_CACHE
+from data.diskCache import DiskCache
 import os
+import json
+import sys
+import time
 
 from .dataSinkAndSource import *
 
-class ConditionalWizard(QWizard):
-    def __init__(self, *argc, **argv):
-        super().__init__(*argc, **argv)
-        self.currentIdChanged.connect(self.onPageChanged)
-        self.__last_idx = 0
-        self.__callback = None
-
-    @Slot()
-    def onPageChanged(self, page_idx):
-        if self.__callback is not None:
-            if self.__last_idx < page_idx:  # changed to the next page
-                if self.__callback(self.__last_idx) is False:
-                    self.back()
-                    return
-        self.__last_idx = page_idx
-            
-    def accept(self):
-        if self.__callback is not None:
-            if self.__callback(-1) is False:
-                return
-        super().accept()
-
-    def registerCallback(self, callback):
-        self.__callback = callback
-
 class ConfigEntry:
     def __init__(self, source_rsw_idx, sink_rsw_idx, target_rsw_idx, source_input, sink_input, target_input):
         self.source_rsw_idx = source_rsw_idx
@@ -47,16 +31,10 @@ class MainWindow:
     def __init__(self):
         self.__dataModel = None
         self.__operation_result = None
+        self.__worker = None
 
     def buildGui(self):
-        ui_file_loader = QUiLoader()
-        ui_file_loader.registerCustomWidget(ResizeStackWidget)
-        ui_file_loader.registerCustomWidget(ConditionalWizard)
-
-        main_ui_file = QFile("ui/main_wizard.ui")
-        main_ui_file.open(QFile.ReadOnly)
-        self._window = ui_file_loader.load(main_ui_file)
-        main_ui_file.close()
+        self._window = loadForm("main_wizard", "Ui_Wizard", ConditionalWizard, [ResizeStackWidget, ConditionalWizard, BusyWizardPage])
 
         #
         def fc(type, name):
@@ -91,16 +69,40 @@ class MainWindow:
         self.__datasink_eagle = AutodeskEagle_DataSink(self._window, fc_p("sink_eagle_sch"), fc_p("sink_eagle_brd"), fc_p("sink_eagle_ic") )
 
         self._window.registerCallback(self.onPageChanged)
+        self._window.currentIdChanged.connect(self.onCurrentIdChanged)
 
         # page 1
 
-        self.__changelog_model = QStandardItemModel()
-        self.__error_model = QStandardItemModel()
+        self.__result_page = fc(BusyWizardPage, "wizardPage_2")
+        self.__progress_bar = fc(QProgressBar, "progress_progressBar")
+        self.__cancel_button = fc_b("cancel_pushButton")
+        self.__cancel_button.clicked.connect(self.onCancel)
+        self.__cancel_button.setEnabled(False)
+
+        # a single thread keeps workers from sharing the cached documents concurrently
+        self.__thread_pool = QThreadPool()
+        self.__thread_pool.setMaxThreadCount(1)
+
+        self.__changelog_model = ChangelogModel()
+        self.__error_model = MessageModel()
+        self.__changelog_proxy = createFilterProxy(self.__changelog_model)
+        self.__error_proxy = createFilterProxy(self.__error_model)
 
         self.__changelog_tableView = fc(QTableView, "changelog_tableView")
-        self.__changelog_tableView.setModel(self.__changelog_model)
+        self.__changelog_tableView.setModel(self.__changelog_proxy)
         self.__error_tableView = fc(QTableView, "error_tableView")
-        self.__error_tableView.setModel(self.__error_model)
+        self.__error_tableView.setModel(self.__error_proxy)
+        for table_view in [self.__changelog_tableView, self.__error_tableView]:
+            # sizes from the first rows only, measuring every cell takes longer than the rename
+            table_view.horizontalHeader().setResizeContentsPrecision(100)
+            table_view.horizontalHeader().setStretchLastSection(True)
+            table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        fc_l("result_filter_lineEdit").textChanged.connect(self.onResultFilterChanged)
+
+        self.__performance_model = QStandardItemModel()
+        self.__performance_tableView = fc(QTableView, "performance_tableView")
+        self.__performance_tableView.setModel(self.__performance_model)
+        fc_b("performance_pushButton").clicked.connect(self.onSavePerformance)
 
         # page 2
 
@@ -166,44 +168,125 @@ class MainWindow:
         sink    = config.sink_input
         target  = config.target_input
 
-        source.load()
-        sink.load()
+        instrumentation = Instrumentation()
+        source.load(instrumentation)
+        sink.load(instrumentation)
 
         target.copyInputFrom(sink)
 
         if source.isLoaded() == False or sink.isLoaded() == False:
             return False
 
-        source_model = source.getModel()
-        sink_model = sink.getModel()
+        self.__operation_result = None
+        self.__changelog_model.setOperationResult(None)
+        self.__error_model.setOperationResult(None)
+        self.__performance_model.clear()
+
+        worker = OperationWorker(source, sink, instrumentation)
+        worker.setAutoDelete(False)
+        worker.signals.progress.connect(self.onWorkerProgress)
+        worker.signals.finished.connect(lambda result: self.onWorkerFinished(worker, result))
+        worker.signals.failed.connect(lambda message: self.onWorkerFailed(worker, message))
+        worker.signals.canceled.connect(lambda: self.onWorkerCanceled(worker))
+        self.__worker = worker
+
+        self.__result_page.setBusy(True)
+        self.__cancel_button.setEnabled(True)
+        self.__progress_bar.setValue(0)
+        self.__thread_pool.start(worker)
 
-        tnn = TargetNetContainer.fromNNC(sink_model, source_model)
-        self.__operation_result = sink.apply(tnn)
-        
-        # display log
-        self.__changelog_model.clear()
-        self.__changelog_model.setHorizontalHeaderLabels(["Pin", "From", "To"])
-        for entry in self.__operation_result.log:
-            self.__changelog_model.appendRow(
-                [
-                    QStandardItem(str(entry.name)), 
-                    QStandardItem(str(entry.net)),
-                    QStandardItem(str(entry.new_net))
-                ]
-            )
-        
-        # display errors
-        self.__error_model.clear()
-        self.__error_model.setHorizontalHeaderLabels(["Type", "Message"])        
-        for line in self.__operation_result.errors:
-            self.__error_model.appendRow([QStandardItem("Error"), QStandardItem(line)])
-        for line in self.__operation_result.warnings:
-            self.__error_model.appendRow([QStandardItem("Warning"), QStandardItem(line)])
+        return True
+
+    @Slot()
+    def onCurrentIdChanged(self, page_idx):
+        # leaving the result page backwards drops a running operation
+        if page_idx == 0 and self.__worker is not None:
+            self.onCancel()
+
+    @Slot()
+    def onCancel(self):
+        if self.__worker is None:
+            return
+        self.__worker.cancel()
+        self.__cancel_button.setEnabled(False)
+        self.__progress_bar.setFormat("Canceling ...")
+
+    def onWorkerProgress(self, value, text):
+        self.__progress_bar.setValue(value)
+        self.__progress_bar.setFormat("{} (%p%)".format(text))
+
+    def onWorkerDone(self, worker):
+        if worker is not self.__worker:
+            return False
+        self.__worker = None
+        self.__cancel_button.setEnabled(False)
+        self.__result_page.setBusy(False)
+        return True
+
+    def onWorkerFinished(self, worker, operation_result):
+        if not self.onWorkerDone(worker):
+            return
+        self.__operation_result = operation_result
+        self.displayResult()
+
+    def onWorkerFailed(self, worker, message):
+        if not self.onWorkerDone(worker):
+            return
+        QMessageBox.critical(self._window, "Operation failed", message)
+        if self._window.currentId() == 1:
+            self._window.back()
+
+    def onWorkerCanceled(self, worker):
+        if not self.onWorkerDone(worker):
+            return
+        self.__progress_bar.setFormat("Canceled")
+        if self._window.currentId() == 1:
+            self._window.back()
+
+    def displayResult(self):
+        # display log, errors and warnings
+        self.__changelog_model.setOperationResult(self.__operation_result)
+        self.__error_model.setOperationResult(self.__operation_result)
 
         self.__changelog_tableView.resizeColumnsToContents()
         self.__error_tableView.resizeColumnsToContents()
 
-        return True
+        self.displayPerformance()
+
+    @Slot()
+    def onResultFilterChanged(self, text):
+        self.__changelog_proxy.setFilterFixedString(text)
+        self.__error_proxy.setFilterFixedString(text)
+
+    def displayPerformance(self):
+        def ms(seconds):
+            return "{:.1f}".format(seconds * 1000)
+        def mb(size):
+            return "-" if size is None else "{:.2f}".format(size / (1024 * 1024))
+
+        self.__performance_model.clear()
+        self.__performance_model.setHorizontalHeaderLabels(["Phase", "Wall time [ms]", "CPU time [ms]", "Peak memory [MB]", "Calls"])
+        for timing in self.__operation_result.instrumentation.phases.values():
+            self.__performance_model.appendRow(
+                [
+                    QStandardItem(timing.name),
+                    QStandardItem(ms(timing.wall_time)),
+                    QStandardItem(ms(timing.cpu_time)),
+                    QStandardItem(mb(timing.peak_memory)),
+                    QStandardItem(str(timing.calls))
+                ]
+            )
+        self.__performance_tableView.resizeColumnsToContents()
+
+    @Slot()
+    def onSavePerformance(self):
+        if self.__operation_result is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self._window, "Save performance data", "", "JSON (*.json)")
+        if len(path) == 0:
+            return
+        with open(path, "w") as f:
+            json.dump(self.__operation_result.instrumentation.toDict(), f, indent=4)
 
     def onWriteFiles(self):
         if self.__operation_result is None:
@@ -211,10 +294,39 @@ class MainWindow:
 
         config = self.config_by_idx[self.__operation_cb.currentIndex()]
 
-        config.target_input.write(self.__operation_result)
-
-def Run(argv, widget):
+        with self.__operation_result.instrumentation.phase(Instrumentation.WRITE):
+            config.target_input.write(self.__operation_result)
+
+# the Win32GUI build has no sys.stdout, there the time goes into a file
+STARTUP_TIME_FILE = "startup_time.txt"
+
+def getStartupTimeFile(argv):
+    # "--startup-time=FILE" writes to FILE, "--startup-time" to stdout if
+    # there is one; None stands for stdout
+    for arg in argv:
+        if arg.startswith("--startup-time="):
+            return arg[len("--startup-time="):]
+    return None if sys.stdout is not None else STARTUP_TIME_FILE
+
+def reportStartupTime(start_time, app, path):
+    line = "startup time: {:.1f} ms\n".format((time.perf_counter() - start_time) * 1000)
+    if path is None:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+    else:
+        # appended, so the file keeps the times of several runs
+        with open(path, "a") as f:
+            f.write(line)
+    app.quit()
+
+def Run(argv, widget, start_time=None):
+    if "--no-disk-cache" not in argv:
+        FILE_CACHE.setDiskCache(DiskCache(DiskCache.getDefaultPath()))
     app = QApplication(argv)
     widget.buildGui()
     widget.show()
+    if start_time is not None and any(arg == "--startup-time" or arg.startswith("--startup-time=") for arg in argv):
+        path = getStartupTimeFile(argv)
+        # the timer fires once the event loop has painted the window
+        QTimer.singleShot(0, lambda: reportStartupTime(start_time, app, path))
     return app.exec_()
\ No newline at end of file
@@ -0,0 +1,52 @@
+from PySide2.QtCore import QObject, QRunnable, Signal
+
+from data.dataModel import TargetNetContainer, Instrumentation, OperationCanceled
+
+class OperationWorkerSignals(QObject):
+    progress = Signal(int, str)
+    finished = Signal(object)
+    failed = Signal(str)
+    canceled = Signal()
+
+# runs getModel, the merge and apply of a source/sink pair outside the GUI thread,
+# a cancel request is honored between the steps and inside the long phases
+class OperationWorker(QRunnable):
+    def __init__(self, source, sink, instrumentation):
+        super().__init__()
+        self.signals = OperationWorkerSignals()
+        self.__source = source
+        self.__sink = sink
+        self.__instrumentation = instrumentation
+        self.__canceled = False
+        self.__instrumentation.is_canceled = self.isCanceled
+
+    def cancel(self):
+        self.__canceled = True
+
+    def isCanceled(self):
+        return self.__canceled
+
+    def step(self, value, text):
+        if self.__canceled:
+            raise OperationCanceled()
+        self.signals.progress.emit(value, text)
+
+    def run(self):
+        try:
+            self.step(0, "Reading source pins")
+            source_model = self.__source.getModel(self.__instrumentation)
+            self.step(30, "Reading sink pins")
+            sink_model = self.__sink.getModel(self.__instrumentation)
+            self.step(60, "Merging pin models")
+            with self.__instrumentation.phase(Instrumentation.MERGE):
+                tnn = TargetNetContainer.fromNNC(sink_model, source_model)
+            self.step(70, "Renaming nets")
+            operation_result = self.__sink.apply(tnn, self.__instrumentation)
+            self.step(100, "Done")
+        except OperationCanceled:
+            self.signals.canceled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(operation_result)
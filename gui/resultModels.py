@@ -0,0 +1,74 @@
+from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# table models that read straight from an OperationContext, the cells are
+# only formatted when the view asks for them
+class ChangelogModel(QAbstractTableModel):
+    HEADERS = ["Pin", "From", "To"]
+
+    def __init__(self, *argc, **argv):
+        super().__init__(*argc, **argv)
+        self.__log = []
+
+    def setOperationResult(self, operation_result):
+        self.beginResetModel()
+        self.__log = [] if operation_result is None else operation_result.log
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.__log)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ChangelogModel.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        entry = self.__log[index.row()]
+        return str((entry.name, entry.net, entry.new_net)[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return ChangelogModel.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+# errors first, then warnings, without copying either list
+class MessageModel(QAbstractTableModel):
+    HEADERS = ["Type", "Message"]
+
+    def __init__(self, *argc, **argv):
+        super().__init__(*argc, **argv)
+        self.__errors = []
+        self.__warnings = []
+
+    def setOperationResult(self, operation_result):
+        self.beginResetModel()
+        self.__errors = [] if operation_result is None else operation_result.errors
+        self.__warnings = [] if operation_result is None else operation_result.warnings
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.__errors) + len(self.__warnings)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(MessageModel.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        if row < len(self.__errors):
+            return "Error" if index.column() == 0 else self.__errors[row]
+        return "Warning" if index.column() == 0 else self.__warnings[row - len(self.__errors)]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return MessageModel.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+def createFilterProxy(source_model, parent=None):
+    # sorts by the display text and filters on all columns
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(source_model)
+    proxy.setFilterKeyColumn(-1)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    return proxy
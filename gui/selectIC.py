@@ -1,47 +1,120 @@
-from PySide2.QtUiTools import QUiLoader
-from PySide2.QtCore import QFile, Slot, QSize, QStringListModel
-from PySide2.QtWidgets import QListView
+from PySide2.QtCore import Slot, QSize, Qt, QAbstractListModel, QModelIndex
+from PySide2.QtWidgets import QListView, QDialog, QLineEdit, QCheckBox
 
+from data.partIndex import PartIndex
+from .forms import loadForm
 
+# shows only the rows of the current filter result, the view asks for the
+# visible rows only
+class PartListModel(QAbstractListModel):
+    def __init__(self, *argc, **argv):
+        super().__init__(*argc, **argv)
+        self.__index = PartIndex([])
+        self.__rows = []
+
+    def setPartIndex(self, index, query):
+        self.beginResetModel()
+        self.__index = index
+        self.__rows = index.search(query)
+        self.endResetModel()
+
+    def setFilter(self, query):
+        self.beginResetModel()
+        self.__rows = self.__index.search(query)
+        self.endResetModel()
+
+    def getPart(self, row):
+        return self.__index.parts[self.__rows[row]]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.__rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name, value, deviceset, pin_count = self.getPart(index.row())
+        if role == Qt.DisplayRole:
+            details = ", ".join(field for field in (value, deviceset) if field != "")
+            return "{} ({})".format(name, details) if details != "" else name
+        if role == Qt.ToolTipRole:
+            return "{} pins".format(pin_count) if pin_count > 0 else None
+        return None
+
+# the dialog is built once and reused with a new list for every selection
 class SelectICDialog:
-    def __init__(self, ic_list):
-        ic_list.sort()
+    instance = None
 
-        self.__ic_model = QStringListModel(ic_list)
+    def __init__(self):
+        self.__part_model = PartListModel()
+        self.__get_parts = lambda pin_counts: []
         self.__accepted = False
         self.__selectedIC = None
-    
+
+    @staticmethod
+    def getInstance():
+        if SelectICDialog.instance is None:
+            SelectICDialog.instance = SelectICDialog()
+            SelectICDialog.instance.buildGUI()
+        return SelectICDialog.instance
+
     def buildGUI(self):
-        ui_file_loader = QUiLoader()
-        dialog_ui_file = QFile("ui/select_ic.ui")
-        dialog_ui_file.open(QFile.ReadOnly)
-        self._window = ui_file_loader.load(dialog_ui_file)
-        dialog_ui_file.close()
+        self._window = loadForm("select_ic", "Ui_Dialog", QDialog)
 
         self.__lv = self._window.findChild(QListView, "listView")
-        self.__lv.setModel(self.__ic_model)
+        self.__lv.setModel(self.__part_model)
         self.__lv.activated.connect(self.onActivated)
         self._window.accepted.connect(self.onAccepted)
 
+        self.__filter = self._window.findChild(QLineEdit, "filter_lineEdit")
+        self.__filter.textChanged.connect(self.onFilterChanged)
+        self.__rank = self._window.findChild(QCheckBox, "rank_checkBox")
+        self.__rank.toggled.connect(self.onRankToggled)
+
+    def setPartSource(self, get_parts):
+        # get_parts(pin_counts) gives the part list, the pin counts are only
+        # read for the ranking
+        self.__get_parts = get_parts
+        self.__accepted = False
+        self.__selectedIC = None
+        self.__filter.clear()
+        self.updateIndex()
+
+    def updateIndex(self):
+        rank_mcu = self.__rank.isChecked()
+        self.__part_model.setPartIndex(PartIndex(self.__get_parts(rank_mcu), rank_mcu), self.__filter.text())
+        if self.__part_model.rowCount() > 0:
+            self.__lv.setCurrentIndex(self.__part_model.index(0))
+
     def getResult(self):
         return self.__accepted, self.__selectedIC
 
     def show(self):
+        self.__filter.setFocus()
         self._window.exec_()
 
+    @Slot()
+    def onFilterChanged(self, text):
+        self.__part_model.setFilter(text)
+        if self.__part_model.rowCount() > 0:
+            self.__lv.setCurrentIndex(self.__part_model.index(0))
+
+    @Slot()
+    def onRankToggled(self, checked):
+        self.updateIndex()
+
     @Slot()
     def onActivated(self, idx):
         self._window.accept()
 
     @Slot()
     def onAccepted(self):
-        idx_list = self.__lv.selectedIndexes()
-        if len(idx_list) == 1:
+        idx = self.__lv.currentIndex()
+        if idx.isValid():
             self.__accepted = True
-            self.__selectedIC = self.__ic_model.data(idx_list[0])
+            self.__selectedIC = self.__part_model.getPart(idx.row())[0]
 
-def openSelectICDialog(ic_list):
-    sid = SelectICDialog(ic_list)
-    sid.buildGUI()
+def openSelectICDialog(get_parts):
+    sid = SelectICDialog.getInstance()
+    sid.setPartSource(get_parts)
     sid.show()
-    return sid.getResult()
\ No newline at end of file
+    return sid.getResult()
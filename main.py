@@ -1,3 +1,6 @@
+import time
+start_time = time.perf_counter()
+
 import sys
 from gui.gui import MainWindow, Run
 
@@ -6,6 +9,7 @@ if __name__ == "__main__":
     sys.exit(
         Run(
             sys.argv,
-            mainWindow
+            mainWindow,
+            start_time
             )
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,9 @@
+import sys
+from benchmark.benchmark import Run
+
+if __name__ == "__main__":
+    sys.exit(
+        Run(
+            sys.argv
+            )
+        )
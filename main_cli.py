@@ -0,0 +1,12 @@
+import sys
+import multiprocessing
+from cli.cli import Run
+
+if __name__ == "__main__":
+    # the worker processes of --jobs start the frozen executable again
+    multiprocessing.freeze_support()
+    sys.exit(
+        Run(
+            sys.argv
+            )
+        )
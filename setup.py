@@ -7,14 +7,17 @@ setup(  name = "STM32CubeMX to Eagle",
         options = {
             "build_exe": {
                 "packages": ["os"],
+                # imported by name at runtime, the module finder can't see them
+                "includes": ["gui.ui_main_wizard", "gui.ui_select_ic", "data.loader"],
                 "excludes": ["tkinter"],
                 "include_files": [
                     (r"ui\main_wizard.ui", r"ui\main_wizard.ui"),
                     (r"ui\select_ic.ui", r"ui\select_ic.ui"),
-                    (r"settings\alternative_pin_names.csv", r"settings\alternative_pin_names.csv")
+                    (r"settings\pin_aliases.db", r"settings\pin_aliases.db")
                 ]
             }
         },
         executables = [
-            Executable("main.py", base="Win32GUI")
+            Executable("main.py", base="Win32GUI"),
+            Executable("main_cli.py")
         ])
\ No newline at end of file
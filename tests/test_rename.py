@@ -0,0 +1,154 @@
+import io
+import sys
+import unittest
+
+# cElementTree is gone since Python 3.9, it has been the same module as
+# ElementTree since 3.3
+try:
+    import xml.etree.cElementTree
+except ImportError:
+    import xml.etree.ElementTree
+    sys.modules["xml.etree.cElementTree"] = xml.etree.ElementTree
+import xml.etree.ElementTree as ET
+
+from data.loader import AutodeskEagle_NetTable, AutodeskEagle_RenamePlan, AutodeskEagle_SCH_Loader
+
+def applySteps(names, steps):
+    # follows the steps on a list of names, a step must never hit a name in use
+    names = list(names)
+    for old_name, new_name in steps:
+        assert new_name not in names, "{} -> {} collides".format(old_name, new_name)
+        names[names.index(old_name)] = new_name
+    return names
+
+def makeNetTable(schematic=(), board=()):
+    net_table = AutodeskEagle_NetTable()
+    net_table.schematic.update(schematic)
+    net_table.board.update(board)
+    return net_table
+
+class RenamePlanTest(unittest.TestCase):
+    def checkPlan(self, rename_map, taken=()):
+        plan = AutodeskEagle_RenamePlan(rename_map)
+        steps = plan.getSteps(taken=taken)
+        names = list(rename_map)
+        self.assertEqual(applySteps(names, steps), [rename_map[name] for name in names])
+        self.assertEqual(AutodeskEagle_RenamePlan.getFinalNames(steps), {old: new for old, new in rename_map.items() if old != new})
+        return plan, steps
+
+    def testChain(self):
+        plan, steps = self.checkPlan({"A": "B", "B": "C", "C": "D"})
+        self.assertEqual(plan.chains, [["C", "B", "A"]])
+        self.assertEqual(plan.cycles, [])
+        self.assertEqual(steps, [("C", "D"), ("B", "C"), ("A", "B")])
+
+    def testSwap(self):
+        plan, steps = self.checkPlan({"A": "B", "B": "A"})
+        self.assertEqual(plan.chains, [])
+        self.assertEqual(len(plan.cycles), 1)
+        self.assertEqual(len(steps), 3)
+
+    def testRotation(self):
+        plan, steps = self.checkPlan({"A": "B", "B": "C", "C": "D", "D": "A"})
+        self.assertEqual(len(plan.cycles), 1)
+        self.assertEqual(len(steps), 5)
+
+    def testMixed(self):
+        plan, _ = self.checkPlan({"A": "B", "B": "A", "C": "D", "D": "E", "F": "G", "G": "H", "H": "F", "I": "I"})
+        self.assertEqual(len(plan.chains), 1)
+        self.assertEqual(len(plan.cycles), 2)
+        self.assertNotIn("I", plan.mapping)
+
+    def testTempNamesSkipTakenNames(self):
+        temp_names = [AutodeskEagle_RenamePlan.TEMP_NAME.format(idx) for idx in range(3)]
+        net_table = makeNetTable(schematic=temp_names[:1], board=temp_names[1:2])
+        _, steps = self.checkPlan({"A": "B", "B": "A", "C": "D", "D": "C"}, taken=net_table)
+        used = {new_name for _, new_name in steps if new_name.startswith("tmp_net_name_")}
+        self.assertEqual(len(used), 2)
+        self.assertNotIn(temp_names[0], used)
+        self.assertNotIn(temp_names[1], used)
+
+    def testTempNamesSkipRenamedNets(self):
+        temp_name = AutodeskEagle_RenamePlan.TEMP_NAME.format(0)
+        # the chain renames a net to the first temporary name, so the
+        # cycle has to take another one
+        _, steps = self.checkPlan({"A": "B", "B": "A", "C": temp_name})
+        self.assertNotIn(("A", temp_name), steps)
+        self.assertNotIn(("B", temp_name), steps)
+
+class FindConflictsTest(unittest.TestCase):
+    def testNoConflicts(self):
+        net_table = makeNetTable(schematic=["A", "B", "C"])
+        self.assertEqual(net_table.findConflicts({"A": "B", "B": "C", "C": "A"}), {})
+
+    def testKeptName(self):
+        net_table = makeNetTable(schematic=["A", "B"])
+        self.assertEqual(net_table.findConflicts({"A": "B"}), {"A": ("B", None)})
+
+    def testBoardOnlyName(self):
+        net_table = makeNetTable(schematic=["A"], board=["A", "GND"])
+        self.assertEqual(net_table.findConflicts({"A": "GND"}), {"A": ("GND", None)})
+
+    def testDuplicateTarget(self):
+        net_table = makeNetTable(schematic=["A", "B"])
+        self.assertEqual(net_table.findConflicts({"A": "X", "B": "X"}), {"B": ("X", "A")})
+
+    def testRepeatedRejection(self):
+        # C can't take D, so C keeps its name and B can't take it either,
+        # which in turn stops A
+        net_table = makeNetTable(schematic=["A", "B", "C", "D"])
+        rejected = net_table.findConflicts({"A": "B", "B": "C", "C": "D"})
+        self.assertEqual(rejected, {"C": ("D", None), "B": ("C", None), "A": ("B", None)})
+
+class RenameSignalsTest(unittest.TestCase):
+    BOARD = (
+        '<eagle><board><signals>'
+        '<signal name="A"><wire/></signal>'
+        "<signal class=\"0\" name='B'/>"
+        '<signal name="Q&quot;1"/>'
+        '<signal name="N&amp;1"/>'
+        '<signal name="KEEP"/>'
+        '</signals></board></eagle>'
+    )
+    RENAME_MAP = {"A": "B", "B": "it's", "Q\"1": "A", "N&1": "x\"<y"}
+
+    def getNames(self, text):
+        return [node.get("name") for node in ET.fromstring(text).iter("signal")]
+
+    def testRename(self):
+        result, renamed = AutodeskEagle_SCH_Loader.renameSignals(self.BOARD, self.RENAME_MAP)
+        self.assertEqual(renamed, 4)
+        self.assertEqual(self.getNames(result), ["B", "it's", "A", "x\"<y", "KEEP"])
+        self.assertIn("<wire/>", result)
+
+    def testChunkBoundaries(self):
+        expected, _ = AutodeskEagle_SCH_Loader.renameSignals(self.BOARD, self.RENAME_MAP)
+        for chunk_size in range(1, len(self.BOARD) + 2):
+            result, renamed = AutodeskEagle_SCH_Loader.renameSignals(io.StringIO(self.BOARD), self.RENAME_MAP, chunk_size=chunk_size)
+            self.assertEqual(result, expected, chunk_size)
+            self.assertEqual(renamed, 4)
+
+    def testOut(self):
+        out = io.StringIO()
+        result, renamed = AutodeskEagle_SCH_Loader.renameSignals(io.StringIO(self.BOARD), self.RENAME_MAP, out, chunk_size=7)
+        self.assertIsNone(result)
+        self.assertEqual(renamed, 4)
+        self.assertEqual(out.getvalue(), AutodeskEagle_SCH_Loader.renameSignals(self.BOARD, self.RENAME_MAP)[0])
+
+    def testNetTableReadsEscapedNames(self):
+        net_table = makeNetTable()
+        net_table.addBoard(io.StringIO(self.BOARD))
+        self.assertEqual(set(net_table.board), {"A", "B", "Q\"1", "N&1", "KEEP"})
+
+class RenameNodesTest(unittest.TestCase):
+    def testRenameAndRestore(self):
+        xml = ET.fromstring('<sheet><net name="A"/><net name="B"/><net name="A"/><net name="C"/></sheet>')
+        before = ET.tostring(xml)
+        steps = AutodeskEagle_RenamePlan({"A": "B", "B": "A", "C": "D"}).getSteps()
+        renamed = AutodeskEagle_SCH_Loader.renameNodes(xml, "net", steps)
+        self.assertEqual([node.get("name") for node in xml.iter("net")], ["B", "A", "B", "D"])
+        AutodeskEagle_SCH_Loader.restoreNodes(renamed)
+        self.assertEqual(ET.tostring(xml), before)
+
+if __name__ == "__main__":
+    unittest.main()